@@ -7,16 +7,28 @@ from PIL import Image, ImageDraw, ImageFont
 from pathlib import Path
 from loguru import logger
 import datetime
+import os
+import signal
+import threading
+import time
+from functools import lru_cache
+from typing import Optional
 
 from time_awareness import TimeAwareness
 
 APP_ID = "time_awareness_tray"
 APP_DIR = Path.home() / ".time_awareness"
+IDLE_REFRESH_INTERVAL = 60  # seconds between tray refreshes while no session is running
+HISTORY_DIALOG_SESSIONS = 500  # latest sessions listed in the history dialog
+ICON_RENDER_VERSION = 2  # bump whenever the icon's size, colours or layout change, so cached icons are re-rendered
 
 def format_duration(td: datetime.timedelta) -> str:
     if td is None:
         return "-"
-    total_seconds = int(td.total_seconds())
+    return _format_seconds(int(td.total_seconds()))  # truncates, so a tiny negative duration shows 0m.
+
+@lru_cache(maxsize=2048)
+def _format_seconds(total_seconds: int) -> str:
     hours, remainder = divmod(total_seconds, 3600)
     minutes = (remainder // 60)
     if hours > 0:
@@ -24,24 +36,28 @@ def format_duration(td: datetime.timedelta) -> str:
     else:
         return f"{minutes}m."
 
+@lru_cache(maxsize=2048)
 def format_time(dt: datetime.datetime) -> str:
     if dt is None:
         return "-"
-    return dt.strftime("%H:%M")
+    return f"{dt.hour:02d}:{dt.minute:02d}"
 
+@lru_cache(maxsize=2048)
 def format_date(dt: datetime.datetime) -> str:
     if dt is None:
         return "-"
-    return dt.strftime("%m.%d.%Y")
+    return f"{dt.month:02d}.{dt.day:02d}.{dt.year}"
 
 class TrayApp:
     def __init__(self, update_app_interval: int = 10):
         """
         Initialize the tray application, indicator, and menu.
         """
-        self._tmp_icon_dir = Path("/tmp/time_awareness/")
-        if not self._tmp_icon_dir.exists():
-            self._tmp_icon_dir.mkdir(parents=True)
+        # Icons are deterministic, so keep them across restarts instead of re-rendering on every launch
+        self._icon_dir = APP_DIR / "icons"
+        if not self._icon_dir.exists():
+            self._icon_dir.mkdir(parents=True)
+        self.prune_icon_dir()
 
         self._ta = TimeAwareness(APP_DIR, start_daemon=True, log_to_terminal=True)
 
@@ -51,19 +67,52 @@ class TrayApp:
 
         self._menu = Gtk.Menu()
         self._menu_items = {}
+        self._last_icon_minute = -1
+        self._icon_by_minute = {}
+        self._icon_lock = threading.Lock()  # serialises render_icon between the prerender thread and the main loop
+        self._icon_base = self._render_icon_base()
+        self._menu_open = False
+        self._refresh_pending = False
+        self._refresh_timer = None  # GLib source id of the next one-shot refresh
+        self._update_app_interval = update_app_interval
+        self._labels = None
+        self._labels_time = 0.0
+        self._shown_labels = {}
         self.build_menu()
+        self._menu.connect("show", self.on_menu_show)
+        self._menu.connect("hide", self.on_menu_hide)
         self.indicator.set_menu(self._menu)
 
         self.update_icon()
+        threading.Thread(target=self._prerender_icons, daemon=True).start()
 
-        GLib.timeout_add_seconds(update_app_interval, self.refresh)  # update every update_app_interval second
+        self._schedule_refresh(update_app_interval * 1000)
         logger.info("TrayApp initialized.")
 
+    def prune_icon_dir(self):
+        """
+        Delete tray icons rendered by another ICON_RENDER_VERSION and temp files left by an interrupted save.
+        """
+        current_prefix = f"tray_icon_v{ICON_RENDER_VERSION}_"
+        stale_icon_files = [
+            icon_file for icon_file in self._icon_dir.glob("tray_icon_*")
+            if not icon_file.name.startswith(current_prefix) or icon_file.suffix != ".png"
+        ]
+        for icon_file in stale_icon_files:
+            icon_file.unlink(missing_ok=True)
+        if stale_icon_files:
+            logger.info("Removed {} stale icons from {}", len(stale_icon_files), self._icon_dir)
+
     def build_menu(self):
         """
         Build the tray menu with session info, controls, and history.
+
+        The menu is built once; later changes only update labels via update_menu_items.
         """
-        self._menu.foreach(lambda widget: self._menu.remove(widget))
+        if self._menu_items:
+            logger.warning("Tray menu already built; updating labels instead.")
+            self.update_menu_items()
+            return
 
         # Current session (dimmed/grey)
         label_current = Gtk.Label()
@@ -73,21 +122,15 @@ class TrayApp:
         item_current.set_sensitive(False)
         self._menu.append(item_current)
 
-        session_info = self._ta.current_session_info()
-        if session_info is not None:
-            start, now, duration = session_info
-            started_dur_label = format_duration(duration)
-            started_date_label = f"Started at {format_time(start)}"
-        else:
-            started_dur_label = "-"
-            started_date_label = "Not running"
+        labels = self._compute_labels()
+        self._shown_labels = dict(labels)
 
-        item_started_dur = Gtk.MenuItem(label=started_dur_label)
+        item_started_dur = Gtk.MenuItem(label=labels["current_session_dur"])
         item_started_dur.set_sensitive(False)
         self._menu.append(item_started_dur)
         self._menu_items["current_session_dur"] = item_started_dur
 
-        item_started = Gtk.MenuItem(label=started_date_label)
+        item_started = Gtk.MenuItem(label=labels["current_session_date"])
         item_started.set_sensitive(False)
         self._menu.append(item_started)
         self._menu_items["current_session_date"] = item_started
@@ -103,8 +146,7 @@ class TrayApp:
         item_total_today.set_sensitive(False)
         self._menu.append(item_total_today)
 
-        total_today_label = format_duration(self._ta.total_time_today())
-        item_total_today_value = Gtk.MenuItem(label=total_today_label)
+        item_total_today_value = Gtk.MenuItem(label=labels["total_today"])
         item_total_today_value.set_sensitive(False)
         self._menu.append(item_total_today_value)
         self._menu_items["total_today"] = item_total_today_value
@@ -120,21 +162,12 @@ class TrayApp:
         item_prev.set_sensitive(False)
         self._menu.append(item_prev)
 
-        previous_session_info = self._ta.previous_session()
-        if previous_session_info is not None:
-            prev_start, prev_end, prev_duration = previous_session_info
-            prev_dur_label = format_duration(prev_duration)
-            prev_date_label = f"{format_date(prev_start)} {format_time(prev_start)}–{format_time(prev_end)}"
-        else:
-            prev_dur_label = "-"
-            prev_date_label = "-"
-
-        item_prev_dur = Gtk.MenuItem(label=prev_dur_label)
+        item_prev_dur = Gtk.MenuItem(label=labels["prev_dur"])
         item_prev_dur.set_sensitive(False)
         self._menu.append(item_prev_dur)
         self._menu_items["prev_dur"] = item_prev_dur
 
-        item_prev_date = Gtk.MenuItem(label=prev_date_label)
+        item_prev_date = Gtk.MenuItem(label=labels["prev_date"])
         item_prev_date.set_sensitive(False)
         self._menu.append(item_prev_date)
         self._menu_items["prev_date"] = item_prev_date
@@ -172,23 +205,30 @@ class TrayApp:
 
         self._menu.show_all()
 
-    def update_menu_items(self):
+    def _compute_labels(self, session_info: Optional[tuple] = None, max_age: float = 2.0) -> dict:
         """
-        Update dynamic menu items with current session and history data.
+        Compute the dynamic menu labels, reusing the last result if it is recent enough.
+
+        Args:
+            session_info (tuple, optional): Result of current_session_info(); fetched if not given.
+            max_age (float): Maximum age in seconds of a cached result.
+
+        Returns:
+            dict: Mapping menu item key to label text.
         """
-        session_info = self._ta.current_session_info()
+        now = time.monotonic()
+        if self._labels is not None and now - self._labels_time < max_age:
+            return self._labels
+
+        if session_info is None:
+            session_info = self._ta.current_session_info(verbose=False)
         if session_info is not None:
-            start, now, duration = session_info
+            start, _, duration = session_info
             started_dur_label = format_duration(duration)
             started_date_label = f"Started at {format_time(start)}"
         else:
             started_dur_label = "-"
             started_date_label = "Not running"
-        self._menu_items["current_session_dur"].set_label(started_dur_label)
-        self._menu_items["current_session_date"].set_label(started_date_label)
-
-        total_today_label = format_duration(self._ta.total_time_today())
-        self._menu_items["total_today"].set_label(total_today_label)
 
         previous_session_info = self._ta.previous_session(verbose=False)
         if previous_session_info is not None:
@@ -198,32 +238,39 @@ class TrayApp:
         else:
             prev_dur_label = "-"
             prev_date_label = "-"
-        self._menu_items["prev_dur"].set_label(prev_dur_label)
-        self._menu_items["prev_date"].set_label(prev_date_label)
 
-    def render_icon(self, td: datetime.timedelta) -> Path:
+        self._labels = {
+            "current_session_dur": started_dur_label,
+            "current_session_date": started_date_label,
+            "total_today": format_duration(self._ta.total_time_today()),
+            "prev_dur": prev_dur_label,
+            "prev_date": prev_date_label,
+        }
+        self._labels_time = now
+        return self._labels
+
+    def update_menu_items(self, session_info: Optional[tuple] = None):
         """
-        Render a tray icon as a circular progress indicator for time spent.
+        Update dynamic menu items with current session and history data.
 
         Args:
-            td (timedelta): Duration to display.
+            session_info (tuple, optional): Result of current_session_info(); fetched if not given.
+        """
+        labels = self._compute_labels(session_info)
+        if labels == self._shown_labels:
+            return
+        for key, label in labels.items():
+            if label != self._shown_labels.get(key):
+                self._menu_items[key].set_label(label)
+        self._shown_labels = dict(labels)
+
+    def _render_icon_base(self) -> Image.Image:
+        """
+        Render the static rings shared by every tray icon.
 
         Returns:
-            Path: Path to the generated icon image.
+            Image: Base icon image without the progress arc.
         """
-        total_minutes = (td.total_seconds() / 60) % 60
-
-        text_filename = f"{int(total_minutes)}m"
-        icon_file = self._tmp_icon_dir / f"tray_icon_{text_filename}.png"
-
-        if icon_file.exists():
-            #logger.debug(f"Using existing icon image for {format_duration(td)} (time delta: {td}): {icon_file}")
-            return icon_file
-
-        # Determine fill percentage (1 hour = full circle, 1.5 hour = half circle etc.)
-        fill_fraction = min(total_minutes / 60.0, 1.0)  # Max 1.0 (100%)
-        fill_color = (200, 200, 200, 255)  # White
-
         # Icon size
         size = 128
         img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
@@ -231,7 +278,7 @@ class TrayApp:
 
         # Circle bounds
         padding = 8
-        bbox = [padding, padding, size - padding, size - padding]
+        self._icon_bbox = [padding, padding, size - padding, size - padding]
 
         # Draw outer white circle (thicker than border)
         outer_padding = padding - 4  # slightly outside
@@ -239,42 +286,157 @@ class TrayApp:
         draw.ellipse(outer_bbox, outline=(200, 200, 200, 255), width=6)
 
         # Draw main grey border
-        draw.ellipse(bbox, outline=(200, 200, 200, 255), width=8)
+        draw.ellipse(self._icon_bbox, outline=(200, 200, 200, 255), width=8)
+        return img
 
-        # Draw the filled arc (progress)
-        if fill_fraction > 0:
-            # Start angle at -90 (12 o'clock), sweep clockwise
-            end_angle = -90 + (360 * fill_fraction)
-            draw.pieslice(bbox, start=-90, end=end_angle, fill=fill_color)
+    def render_icon(self, td: datetime.timedelta) -> Path:
+        """
+        Render a tray icon as a circular progress indicator for time spent.
 
-        # Save icon
-        logger.debug(f"Rendering icon image for {format_duration(td)} (time delta: {td}): {icon_file}")
-        img.save(icon_file.as_posix())
-        return icon_file
+        Args:
+            td (timedelta): Duration to display.
 
-    def update_icon(self):
+        Returns:
+            Path: Path to the generated icon image.
+        """
+        total_minutes = (max(int(td.total_seconds()), 0) // 60) % 60
+
+        text_filename = f"{total_minutes}m"
+        icon_file = self._icon_dir / f"tray_icon_v{ICON_RENDER_VERSION}_{text_filename}.png"
+
+        with self._icon_lock:
+            if icon_file.exists():
+                try:
+                    with Image.open(icon_file) as existing:
+                        existing.verify()
+                    #logger.debug(f"Using existing icon image for {format_duration(td)} (time delta: {td}): {icon_file}")
+                    return icon_file
+                except Exception as e:
+                    logger.warning("Re-rendering unreadable icon {}: {}", icon_file, e)
+
+            # Determine fill percentage (1 hour = full circle, 1.5 hour = half circle etc.)
+            fill_fraction = min(total_minutes / 60.0, 1.0)  # Max 1.0 (100%)
+            fill_color = (200, 200, 200, 255)  # White
+
+            img = self._icon_base.copy()
+            draw = ImageDraw.Draw(img)
+            bbox = self._icon_bbox
+
+            # Draw the filled arc (progress)
+            if fill_fraction > 0:
+                # Start angle at -90 (12 o'clock), sweep clockwise
+                end_angle = -90 + (360 * fill_fraction)
+                draw.pieslice(bbox, start=-90, end=end_angle, fill=fill_color)
+
+            # Save icon to a temp file and move it into place, so the indicator never sees a half-written PNG
+            logger.debug(f"Rendering icon image for {format_duration(td)} (time delta: {td}): {icon_file}")
+            tmp_file = icon_file.with_name(icon_file.name + ".tmp")
+            img.save(tmp_file.as_posix(), format="PNG")
+            os.replace(tmp_file, icon_file)
+            return icon_file
+
+    def _prerender_icons(self):
+        """
+        Render every possible tray icon (one per minute of the hour) in the background.
+        """
+        for minute in range(60):
+            if minute not in self._icon_by_minute:
+                self._icon_by_minute[minute] = self.render_icon(datetime.timedelta(minutes=minute))
+        logger.debug("Pre-rendered {} tray icons in {}", len(self._icon_by_minute), self._icon_dir)
+
+    def update_icon(self, session_info: Optional[tuple] = None):
         """
         Update the tray icon to reflect the current session duration.
+
+        Args:
+            session_info (tuple, optional): Result of current_session_info(); fetched if not given.
         """
-        session_info = self._ta.current_session_info()
+        if session_info is None:
+            session_info = self._ta.current_session_info(verbose=False)
         if session_info is not None:
             _, _, duration = session_info
         else:
             duration = datetime.timedelta(seconds=0)
 
-        current_icon_file = self.render_icon(duration)
+        # The icon only changes once per minute (and wraps every hour), so skip re-rendering otherwise
+        minute = (max(int(duration.total_seconds()), 0) // 60) % 60
+        if minute == self._last_icon_minute:
+            return
+
+        current_icon_file = self._icon_by_minute.get(minute)
+        if current_icon_file is None:
+            current_icon_file = self.render_icon(duration)
+            self._icon_by_minute[minute] = current_icon_file
         self.indicator.set_icon_full(current_icon_file.as_posix(), "App Icon")
+        self._last_icon_minute = minute
+
+    def _schedule_refresh(self, interval_ms: int):
+        """
+        (Re)arm the one-shot refresh timer, replacing any pending one.
+        """
+        if self._refresh_timer is not None:
+            GLib.source_remove(self._refresh_timer)
+        self._refresh_timer = GLib.timeout_add(interval_ms, self._on_refresh_timer)
+
+    def _on_refresh_timer(self):
+        self._refresh_timer = None
+        self.refresh()
+        return False  # one-shot; _do_refresh arms the next one
+
+    def _next_refresh_ms(self, session_info) -> int:
+        """
+        Milliseconds until the tray next needs refreshing.
+
+        The icon only shows whole minutes, so a running session needs a refresh just after the next minute
+        boundary; with no session the icon shows 0m and the refresh only has to notice a new session.
+        """
+        if self._menu_open:
+            return self._update_app_interval * 1000
+        if session_info is None:
+            return IDLE_REFRESH_INTERVAL * 1000
+        _, _, duration = session_info
+        return (60 - max(int(duration.total_seconds()), 0) % 60) * 1000 + 100  # just past the boundary
 
     def refresh(self):
         """
-        Refresh the tray icon and menu items.
+        Schedule a refresh of the tray icon and menu items for when the main loop is idle.
 
         Returns:
-            bool: True to continue periodic refresh.
+            bool: True, so it can also be passed directly as a GLib callback.
         """
-        self.update_icon()
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            GLib.idle_add(self._do_refresh)
+        return True
+
+    def _do_refresh(self):
+        """
+        Refresh the tray icon, and the menu items while the menu is open.
+
+        Returns:
+            bool: False to run only once per scheduled refresh.
+        """
+        self._refresh_pending = False
+        session_info = self._ta.current_session_info(verbose=False)
+        self.update_icon(session_info)
+        if self._menu_open:
+            self.update_menu_items(session_info)
+        self._schedule_refresh(self._next_refresh_ms(session_info))
+        return False
+
+    def on_menu_show(self, widget):
+        """
+        Bring the menu items up to date when the menu is opened.
+        """
+        self._menu_open = True
         self.update_menu_items()
-        return True  # continue timer
+        self._schedule_refresh(self._update_app_interval * 1000)  # keep the open menu's labels live
+
+    def on_menu_hide(self, widget):
+        """
+        Stop updating menu items while the menu is closed.
+        """
+        self._menu_open = False
 
     def on_disable(self, widget):
         """
@@ -285,6 +447,7 @@ class TrayApp:
             logger.info("Session ended via tray menu.")
         except Exception:
             logger.warning("Tried to end session via tray menu, but no session was active.")
+        self._labels = None  # session state changed
         self.refresh()
 
     def on_new_session(self, widget):
@@ -293,37 +456,40 @@ class TrayApp:
         """
         self._ta.start_session()
         logger.info("New session started via tray menu.")
+        self._labels = None  # session state changed
         self.refresh()
 
     def on_history(self, widget):
         """
         Show a dialog with session history and statistics.
         """
-        hist = self._ta.history()
-        number_of_sessions = len(hist['sessions'])
+        hist = self._ta.history(limit=HISTORY_DIALOG_SESSIONS)
+        number_of_sessions = hist['session_count']
         number_of_sessions_digits = len(str(number_of_sessions)) if number_of_sessions > 0 else 1
-        logger.info("History dialog opened. Sessions: {}", len(hist['sessions']))
-
-        msg = (
-            f"Days tracked: {hist['days']}\n"
-            f"Total today: {format_duration(hist['total_today'])}\n"
-            f"Total yesterday: {format_duration(hist['total_yesterday'])}\n"
-            f"7-day avg: {format_duration(hist['seven_day_average'])}\n"
-            f"Weekday avg: {format_duration(hist['weekday_average'])}\n"
-            f"Total avg: {format_duration(hist['total_average'])}\n"
-            f"Sessions: {number_of_sessions}\n\n"
-        )
-
-        session_lines = []
-        for i, session_info in enumerate(hist['sessions'], start=1):
-            session_start, session_end, session_duration = session_info
+        logger.info("History dialog opened. Sessions: {}", number_of_sessions)
+
+        lines = [
+            f"Days tracked: {hist['days']}",
+            f"Total today: {format_duration(hist['total_today'])}",
+            f"Total yesterday: {format_duration(hist['total_yesterday'])}",
+            f"7-day avg: {format_duration(hist['seven_day_average'])}",
+            f"Weekday avg: {format_duration(hist['weekday_average'])}",
+            f"Total avg: {format_duration(hist['total_average'])}",
+            f"Sessions: {number_of_sessions}",
+            "",
+        ]
+
+        for i, (session_start, session_end, session_duration) in enumerate(hist['sessions'], start=1):
             if session_duration.total_seconds() < 60 * 60 * 24:
                 session_date = f"{format_date(session_start)} {format_time(session_start)}–{format_time(session_end)}"
             else:
                 session_date = f"{format_date(session_start)} {format_time(session_start)} – {format_date(session_end)} {format_time(session_end)}"
-            session_dur = format_duration(session_duration)
-            session_lines.append(f"({str(i).rjust(number_of_sessions_digits)}/{number_of_sessions}) {session_date} ({session_dur})")
-        msg += "\n".join(session_lines) if session_lines else "No previous sessions."
+            lines.append(f"({str(i).rjust(number_of_sessions_digits)}/{number_of_sessions}) {session_date} ({format_duration(session_duration)})")
+        if number_of_sessions > len(hist['sessions']):
+            lines.append(f"... {number_of_sessions - len(hist['sessions'])} older sessions not shown")
+        if not number_of_sessions:
+            lines.append("No previous sessions.")
+        msg = "\n".join(lines)
 
         dialog = Gtk.Dialog(
             title="Session History",
@@ -365,13 +531,21 @@ class TrayApp:
         if response == Gtk.ResponseType.YES:
             self._ta.reset()
             logger.info("Database reset via tray menu.")
+            self._labels = None  # session state changed
             self.refresh()
 
     def quit(self):
         self._ta.stop_daemon()  # Stop the daemon thread if running
-        logger.info("Cleaning up icons in {}", self._tmp_icon_dir)
-        for icon_file in self._tmp_icon_dir.glob("tray_icon_*.png"):
-            icon_file.unlink(missing_ok=True)
+        self._ta.close()  # Close the database connection held open for the app lifetime
+
+    def on_signal(self, signum: int) -> bool:
+        """
+        Quit cleanly on SIGTERM/SIGINT (logout, systemd stop, Ctrl+C) so the open session is saved.
+        """
+        logger.info("Tray app quitting on signal {}.", signal.Signals(signum).name)
+        self.quit()
+        Gtk.main_quit()
+        return GLib.SOURCE_REMOVE
 
     def on_quit(self, widget):
         """
@@ -388,6 +562,9 @@ def main():
     app = None
     try:
         app = TrayApp()
+        # GLib dispatches these from the main loop, unlike Python handlers that wait for the next Python callback
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signum, app.on_signal, signum)
         Gtk.main()
     except KeyboardInterrupt:
         print("KeyboardInterrupt detected, quitting...")
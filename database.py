@@ -1,42 +1,145 @@
+import copy
 import datetime
-from functools import wraps
+import threading
+from contextlib import contextmanager
+from functools import lru_cache, wraps
 from pathlib import Path
 from typing import Any, List, Tuple, Union
 
 from loguru import logger
-from peewee import SqliteDatabase, Model, DateTimeField, FloatField, TextField, DatabaseProxy
+from peewee import fn, Case, SqliteDatabase, Model, DateTimeField, FloatField, TextField, DatabaseProxy
 
 database_proxy = DatabaseProxy()
+_write_generation = 0  # bumped on every write to invalidate cached_read results
+# Marks threads whose connection was opened by with_database/db_session and is closed again afterwards
+_short_lived_connection = threading.local()
+
+# WAL lets readers run alongside the daemon's writes, and NORMAL sync is durable enough in WAL mode
+DATABASE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'cache_size': -64000,  # KiB
+    'temp_store': 'memory',
+    'mmap_size': 134217728,  # 128 MiB
+    'busy_timeout': 5000,  # milliseconds
+    'foreign_keys': 1,
+    'wal_autocheckpoint': 0,  # checkpoints are run by the daemon via checkpoint_database()
+}
+
+class ISODateTimeField(DateTimeField):
+    """
+    DateTimeField that parses stored values with datetime.fromisoformat instead of peewee's
+    strptime-per-format fallback, falling back to it for values in any other format.
+    """
+    def python_value(self, value):
+        if isinstance(value, str):
+            try:
+                return datetime.datetime.fromisoformat(value)
+            except ValueError:
+                pass
+        return super().python_value(value)
 
 class BaseModel(Model):
     class Meta:
         database = database_proxy
 
 class Session(BaseModel):
-    start = DateTimeField(index=True)
-    end = DateTimeField(index=True)
+    start = ISODateTimeField()
+    end = ISODateTimeField()
     duration = FloatField()  # Store duration in seconds
 
+    class Meta:
+        # Covering index so range and latest-session reads never touch the table rows
+        indexes = (
+            (('start', 'end', 'duration'), False),
+        )
+
 class MetaData(BaseModel):
     key = TextField(unique=True)
     value = TextField()
 
-def configure_database(database: Path):
+# query_only makes SQLite reject any write on read-only connections instead of taking the write lock
+READONLY_DATABASE_PRAGMAS = {
+    'query_only': 1,
+    'cache_size': -32000,  # KiB
+    'temp_store': 'memory',
+    'busy_timeout': 5000,  # milliseconds
+}
+
+# Single-statement UPSERT that keeps the existing row instead of REPLACE's delete + insert
+UPSERT_METADATA_SQL = (
+    'INSERT INTO "metadata" ("key", "value") VALUES (?, ?) '
+    'ON CONFLICT ("key") DO UPDATE SET "value" = excluded."value"'
+)
+
+# Fixed SQL text so sqlite3's per-connection statement cache reuses one prepared statement
+GET_METADATA_SQL = 'SELECT "value" FROM "metadata" WHERE "key" = ?'
+
+# One fixed INSERT, prepared once per connection and re-bound per row by executemany
+INSERT_SESSION_SQL = 'INSERT INTO "session" ("start", "end", "duration") VALUES (?, ?, ?)'
+
+# Latest session straight from the covering index, without building a peewee query per call
+PREVIOUS_SESSION_SQL = 'SELECT "start", "end", "duration" FROM "session" ORDER BY "start" DESC LIMIT 1'
+
+def configure_database(database: Path, read_only: bool = False):
     """
     Configure and initialize the SQLite database connection using the provided path.
 
     Args:
         database (Path): Path to the SQLite database file.
+        read_only (bool): If True, open an existing database read-only so readers never take the write lock.
 
     Returns:
         SqliteDatabase: The configured database instance.
     """
-    logger.info("Configuring database: {}", database)
-    db = SqliteDatabase(database.as_posix(), autoconnect=False)
+    logger.info("Configuring database: {} (read-only: {})", database, read_only)
+    if read_only:
+        db = SqliteDatabase(f"file:{database.as_posix()}?mode=ro", uri=True,
+                            pragmas=READONLY_DATABASE_PRAGMAS, autoconnect=False)
+    else:
+        db = SqliteDatabase(database.as_posix(), pragmas=DATABASE_PRAGMAS, autoconnect=False)
     database_proxy.initialize(db)
-    logger.info("Database configured successfully: {}", database)
+    invalidate_read_cache()
+    # Keep this thread's connection open for the process lifetime; with_database leaves it open
+    db.connect(reuse_if_open=True)
+    logger.info("Database configured successfully: {} (journal mode: {})",
+                database, db.execute_sql("PRAGMA journal_mode").fetchone()[0])
     return db
 
+def close_database():
+    """
+    Close the current thread's database connection if it is open.
+    """
+    if not database_proxy.is_closed():
+        try:
+            # Let SQLite refresh its query planner statistics before the connection goes away
+            database_proxy.execute_sql("PRAGMA analysis_limit=400")
+            database_proxy.execute_sql("PRAGMA optimize")
+        except Exception as e:
+            logger.warning("Failed to optimize database before closing: {}", e)
+        checkpoint_database()
+        database_proxy.close()
+        invalidate_read_cache()  # a later connection starts its data_version over
+        logger.info("Database connection closed")
+
+def checkpoint_database() -> bool:
+    """
+    Copy the WAL back into the database file and truncate it.
+
+    Automatic checkpoints are disabled, so this keeps the WAL bounded without a checkpoint ever
+    landing in the middle of a session write.
+
+    Returns:
+        bool: True if the checkpoint ran, False otherwise.
+    """
+    try:
+        busy, log_pages, checkpointed_pages = database_proxy.execute_sql("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        logger.debug("WAL checkpoint: busy={}, log pages={}, checkpointed pages={}", busy, log_pages, checkpointed_pages)
+        return True
+    except Exception as e:
+        logger.error("Failed to checkpoint database: {}", e)
+        return False
+
 def with_database(func):
     """
     Decorator to ensure database connection is open for the wrapped function.
@@ -47,6 +150,7 @@ def with_database(func):
         was_closed = database_proxy.is_closed()
         if was_closed:
             database_proxy.connect()
+            _short_lived_connection.open = True
         try:
             result = func(*args, **kwargs)
             return result
@@ -54,10 +158,63 @@ def with_database(func):
             raise
         finally:
             # Only close if we opened the connection
-            if was_closed and not database_proxy.is_closed():
-                database_proxy.close()
+            if was_closed:
+                _short_lived_connection.open = False
+                if not database_proxy.is_closed():
+                    database_proxy.close()
     return wrapper
 
+def invalidate_read_cache():
+    """
+    Invalidate all results memoized by cached_read; called after every write.
+    """
+    global _write_generation
+    _write_generation += 1
+
+def cached_read(func):
+    """
+    Decorator to memoize a read-only query until the next write.
+
+    Results are keyed on the in-process write generation and on SQLite's data_version, which changes
+    when another connection (e.g. a daemon in a different process) commits. data_version is only
+    comparable within one connection, so only the long-lived connection opened by configure_database
+    is cached; reads on a connection opened just for the call go straight to the database. Must be
+    applied below with_database so the connection is open. Lists and dicts are returned as shallow copies.
+    """
+    @lru_cache(maxsize=32)
+    def cached(generation, data_version, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if getattr(_short_lived_connection, "open", False):
+            return func(*args, **kwargs)
+        data_version = database_proxy.execute_sql("PRAGMA data_version").fetchone()[0]
+        result = cached(_write_generation, data_version, *args, **kwargs)
+        return copy.copy(result) if isinstance(result, (list, dict)) else result
+
+    wrapper.cache_clear = cached.cache_clear
+    wrapper.cache_info = cached.cache_info
+    return wrapper
+
+@contextmanager
+def db_session():
+    """
+    Context manager that keeps the current thread's connection open for the whole block,
+    so with_database calls inside it reuse the connection instead of reconnecting each time.
+    """
+    was_closed = database_proxy.is_closed()
+    if was_closed:
+        database_proxy.connect()
+        _short_lived_connection.open = True
+    try:
+        yield
+    finally:
+        if was_closed:
+            _short_lived_connection.open = False
+            if not database_proxy.is_closed():
+                database_proxy.close()
+
 @with_database
 def create_tables_if_not_exist():
     """
@@ -75,6 +232,14 @@ def create_tables_if_not_exist():
     else:
         logger.info("All tables already exist")
 
+    # Bring indexes of databases created by older versions up to date
+    Session._schema.create_indexes(safe=True)
+    # The covering index starts with "start", which makes the old single-column indexes redundant
+    db.execute_sql('DROP INDEX IF EXISTS "session_start"')
+    db.execute_sql('DROP INDEX IF EXISTS "session_end"')
+    # Expression index so counting distinct days is an index-only scan
+    db.execute_sql('CREATE INDEX IF NOT EXISTS "session_start_date" ON "session" (date("start"))')
+
 @with_database
 def save_session(start: datetime.datetime, end: datetime.datetime, duration: datetime.timedelta) -> bool:
     """
@@ -88,15 +253,36 @@ def save_session(start: datetime.datetime, end: datetime.datetime, duration: dat
     Returns:
         bool: True if saved successfully, False otherwise.
     """
+    if not save_sessions([(start, end, duration)]):
+        return False
+    logger.info("Session saved: {} - {} (duration: {})", start, end, duration)
+    return True
+
+@with_database
+def save_sessions(sessions: List[Tuple[datetime.datetime, datetime.datetime, datetime.timedelta]]) -> bool:
+    """
+    Save several session records in a single transaction.
+
+    Args:
+        sessions (list): List of tuples (start, end, duration).
+
+    Returns:
+        bool: True if all sessions were saved, False otherwise (in which case none are saved).
+    """
+    # str(datetime) is the same "YYYY-MM-DD HH:MM:SS[.ffffff]" text peewee stores for DateTimeField
+    rows = [(str(start), str(end), duration.total_seconds()) for start, end, duration in sessions]
     try:
-        Session.create(start=start, end=end, duration=duration.total_seconds())
-        logger.info("Session saved: {} - {} (duration: {})", start, end, duration)
+        with database_proxy.atomic():
+            database_proxy.cursor().executemany(INSERT_SESSION_SQL, rows)
+        invalidate_read_cache()
+        logger.debug("Saved {} sessions", len(rows))
         return True
     except Exception as e:
-        logger.error("Failed to save session: {}", e)
+        logger.error("Failed to save sessions: {}", e)
         return False
 
 @with_database
+@cached_read
 def get_sessions(return_count: bool = False) -> Union[int, List[Tuple[datetime.datetime, datetime.datetime, datetime.timedelta]]]:
     """
     Retrieve all session records from the database.
@@ -112,9 +298,10 @@ def get_sessions(return_count: bool = False) -> Union[int, List[Tuple[datetime.d
         return Session.select().count()
 
     try:
+        query = Session.select(Session.start, Session.end, Session.duration).order_by(Session.start.desc())
         history = [
-            (s.start, s.end, datetime.timedelta(seconds=s.duration))
-            for s in Session.select().order_by(Session.start.desc())
+            (start, end, datetime.timedelta(seconds=duration))
+            for start, end, duration in query.tuples().iterator()
         ]
         logger.debug("Fetched {} sessions from history", len(history))
         return history
@@ -122,6 +309,46 @@ def get_sessions(return_count: bool = False) -> Union[int, List[Tuple[datetime.d
         logger.error("Failed to fetch session history: {}", e)
         return []
 
+@with_database
+@cached_read
+def get_all_sessions_raw() -> List[Tuple[datetime.datetime, datetime.datetime, float]]:
+    """
+    Retrieve all session records in a single query, oldest first, without building model instances.
+
+    Returns:
+        list: List of tuples (start, end, duration in seconds).
+    """
+    try:
+        query = Session.select(Session.start, Session.end, Session.duration).order_by(Session.start)
+        rows = list(query.tuples().iterator())
+        logger.debug("Fetched {} raw sessions", len(rows))
+        return rows
+    except Exception as e:
+        logger.error("Failed to fetch raw sessions: {}", e)
+        return []
+
+@with_database
+@cached_read
+def get_latest_sessions_raw(limit: int) -> List[Tuple[datetime.datetime, datetime.datetime, float]]:
+    """
+    Retrieve the most recent session records, newest first, without building model instances.
+
+    Args:
+        limit (int): Maximum number of sessions to return.
+
+    Returns:
+        list: List of tuples (start, end, duration in seconds).
+    """
+    try:
+        query = Session.select(Session.start, Session.end, Session.duration).order_by(
+            Session.start.desc()).limit(limit)
+        rows = list(query.tuples().iterator())
+        logger.debug("Fetched {} latest raw sessions", len(rows))
+        return rows
+    except Exception as e:
+        logger.error("Failed to fetch latest raw sessions: {}", e)
+        return []
+
 @with_database
 def set_metadata(key: str, value: Any) -> bool:
     """
@@ -135,7 +362,8 @@ def set_metadata(key: str, value: Any) -> bool:
         bool: True if set successfully, False otherwise.
     """
     try:
-        MetaData.insert(key=key, value=str(value)).on_conflict_replace().execute()
+        database_proxy.execute_sql(UPSERT_METADATA_SQL, (key, str(value)))
+        invalidate_read_cache()
         logger.info("Metadata set: {} = {}", key, value)
         return True
     except Exception as e:
@@ -143,6 +371,29 @@ def set_metadata(key: str, value: Any) -> bool:
         return False
 
 @with_database
+def set_metadata_bulk(values: dict) -> bool:
+    """
+    Set several metadata key-value pairs in a single transaction.
+
+    Args:
+        values (dict): Mapping of metadata key to value.
+
+    Returns:
+        bool: True if all pairs were set, False otherwise (in which case none are set).
+    """
+    try:
+        with database_proxy.atomic():
+            database_proxy.cursor().executemany(
+                UPSERT_METADATA_SQL, [(key, str(value)) for key, value in values.items()])
+        invalidate_read_cache()
+        logger.info("Metadata set: {}", values)
+        return True
+    except Exception as e:
+        logger.error("Failed to set metadata {}: {}", list(values), e)
+        return False
+
+@with_database
+@cached_read
 def get_metadata(key: str, default: Any = None):
     """
     Get a metadata value by key.
@@ -155,14 +406,16 @@ def get_metadata(key: str, default: Any = None):
         Any: Metadata value or default.
     """
     try:
-        entry = MetaData.get_or_none(MetaData.key == key)
-        logger.debug("Metadata fetched: {} = {}", key, entry.value if entry else default)
-        return entry.value if entry else default
+        row = database_proxy.execute_sql(GET_METADATA_SQL, (key,)).fetchone()
+        value = row[0] if row else default
+        logger.debug("Metadata fetched: {} = {}", key, value)
+        return value
     except Exception as e:
         logger.error("Failed to get metadata '{}': {}", key, e)
         return default
 
 @with_database
+@cached_read
 def get_sessions_since(since_dt: datetime.datetime):
     """
     Get sessions started since a given datetime.
@@ -174,10 +427,12 @@ def get_sessions_since(since_dt: datetime.datetime):
         list: List of tuples (start, end, duration).
     """
     try:
-        query = Session.select().where(Session.start >= since_dt).order_by(Session.start)
+        query = Session.select(Session.start, Session.end, Session.duration).where(
+            Session.start >= since_dt
+        ).order_by(Session.start)
         history = [
-            (s.start, s.end, datetime.timedelta(seconds=s.duration))
-            for s in query
+            (start, end, datetime.timedelta(seconds=duration))
+            for start, end, duration in query.tuples().iterator()
         ]
         logger.debug("Fetched {} sessions since {}", len(history), since_dt)
         return history
@@ -186,6 +441,7 @@ def get_sessions_since(since_dt: datetime.datetime):
         return []
 
 @with_database
+@cached_read
 def get_sessions_by_weekday():
     """
     Get sessions grouped by weekday.
@@ -195,12 +451,12 @@ def get_sessions_by_weekday():
     """
     try:
         weekday_histories = {}
-        for s in Session.select():
-            weekday = s.start.weekday()
-            duration = datetime.timedelta(seconds=s.duration)
-            if weekday not in weekday_histories:
-                weekday_histories[weekday] = []
-            weekday_histories[weekday].append(duration)
+        # Let SQLite extract the weekday so no datetime is parsed per row
+        weekday = fn.strftime('%w', Session.start).cast('INTEGER')
+        query = Session.select(weekday, Session.duration)
+        for day, duration in query.tuples().iterator():
+            # SQLite's %w counts from Sunday = 0, datetime.weekday() from Monday = 0
+            weekday_histories.setdefault((day + 6) % 7, []).append(datetime.timedelta(seconds=duration))
         logger.debug("Fetched sessions grouped by weekday")
         return weekday_histories
     except Exception as e:
@@ -208,6 +464,68 @@ def get_sessions_by_weekday():
         return {}
 
 @with_database
+@cached_read
+def get_weekday_totals():
+    """
+    Get total session duration and session count per weekday, aggregated in SQL.
+
+    Returns:
+        dict: Mapping weekday (int, Monday is 0) to tuple (total seconds, session count).
+    """
+    try:
+        weekday = fn.strftime('%w', Session.start).cast('INTEGER')
+        query = Session.select(weekday, fn.SUM(Session.duration), fn.COUNT(Session.id)).group_by(weekday)
+        # SQLite's %w counts from Sunday = 0, datetime.weekday() from Monday = 0
+        weekday_totals = {(day + 6) % 7: (total, count) for day, total, count in query.tuples()}
+        logger.debug("Fetched session totals for {} weekdays", len(weekday_totals))
+        return weekday_totals
+    except Exception as e:
+        logger.error("Failed to fetch weekday totals: {}", e)
+        return {}
+
+@with_database
+@cached_read
+def get_aggregate_stats(day: datetime.date, since_dt: datetime.datetime):
+    """
+    Get overall session statistics in a single aggregate query.
+
+    Args:
+        day (date): Day to total separately (e.g. yesterday).
+        since_dt (datetime): Start of the recent window to total separately (e.g. seven days ago).
+
+    Returns:
+        dict: Keys 'days' and 'sessions' (counts), 'total' (seconds), 'day_total' (seconds on `day`),
+            'since_total' (seconds since `since_dt`) and 'since_days' (days with sessions since `since_dt`).
+    """
+    day_start = datetime.datetime.combine(day, datetime.time.min)
+    day_end = day_start + datetime.timedelta(days=1)
+    in_day = (Session.start >= day_start) & (Session.start < day_end)
+    in_window = Session.start >= since_dt
+    try:
+        query = Session.select(
+            fn.COUNT(fn.DISTINCT(fn.DATE(Session.start))),
+            fn.COUNT(Session.id),
+            fn.TOTAL(Session.duration),
+            fn.TOTAL(Case(None, [(in_day, Session.duration)], 0)),
+            fn.TOTAL(Case(None, [(in_window, Session.duration)], 0)),
+            fn.COUNT(fn.DISTINCT(Case(None, [(in_window, fn.DATE(Session.start))], None))),
+        )
+        days, sessions, total, day_total, since_total, since_days = query.tuples().get()
+        logger.debug("Fetched aggregate stats over {} sessions", sessions)
+        return {
+            "days": days,
+            "sessions": sessions,
+            "total": total,
+            "day_total": day_total,
+            "since_total": since_total,
+            "since_days": since_days,
+        }
+    except Exception as e:
+        logger.error("Failed to fetch aggregate stats: {}", e)
+        return {"days": 0, "sessions": 0, "total": 0.0, "day_total": 0.0, "since_total": 0.0, "since_days": 0}
+
+@with_database
+@cached_read
 def get_sessions_for_day(day: datetime.date):
     """
     Get all sessions for a specific day.
@@ -220,13 +538,14 @@ def get_sessions_for_day(day: datetime.date):
     """
     try:
         start_dt = datetime.datetime.combine(day, datetime.time.min)
-        end_dt = datetime.datetime.combine(day, datetime.time.max)
-        query = Session.select().where(
-            (Session.start >= start_dt) & (Session.start <= end_dt)
+        end_dt = start_dt + datetime.timedelta(days=1)
+        # Half-open range on the raw column so SQLite can seek the (start, end, duration) index
+        query = Session.select(Session.start, Session.end, Session.duration).where(
+            (Session.start >= start_dt) & (Session.start < end_dt)
         ).order_by(Session.start)
         history = [
-            (s.start, s.end, datetime.timedelta(seconds=s.duration))
-            for s in query
+            (start, end, datetime.timedelta(seconds=duration))
+            for start, end, duration in query.tuples().iterator()
         ]
         logger.debug("Fetched {} sessions for {}", len(history), day)
         return history
@@ -246,16 +565,13 @@ def get_previous_session(verbose: bool = True):
         tuple: (start, end, duration) of the previous session, or None if no sessions exist.
     """
     try:
-        session = Session.select().order_by(Session.start.desc()).first()
+        session = database_proxy.execute_sql(PREVIOUS_SESSION_SQL).fetchone()
         if session:
-            result = (
-                session.start,
-                session.end,
-                datetime.timedelta(seconds=session.duration)
-            )
+            start, end, duration = session
+            start, end = datetime.datetime.fromisoformat(start), datetime.datetime.fromisoformat(end)
             if verbose:
-                logger.debug("Fetched previous session: {} - {}", session.start, session.end)
-            return result
+                logger.debug("Fetched previous session: {} - {}", start, end)
+            return start, end, datetime.timedelta(seconds=duration)
         else:
             if verbose:
                 logger.debug("No previous session found")
@@ -265,6 +581,7 @@ def get_previous_session(verbose: bool = True):
         return None
 
 @with_database
+@cached_read
 def get_days_tracked():
     """
     Get the number of unique days with tracked sessions.
@@ -273,11 +590,9 @@ def get_days_tracked():
         int: Number of days tracked.
     """
     try:
-        days = set()
-        for s in Session.select(Session.start):
-            days.add(s.start.date())
-        logger.debug("Fetched days tracked: {}", len(days))
-        return len(days)
+        days = Session.select(fn.COUNT(fn.DISTINCT(fn.DATE(Session.start)))).scalar() or 0
+        logger.debug("Fetched days tracked: {}", days)
+        return days
     except Exception as e:
         logger.error("Failed to fetch days tracked: {}", e)
         return 0
@@ -291,4 +606,5 @@ def reset_database():
     with db.atomic():
         Session.delete().execute()
         MetaData.delete().execute()
+    invalidate_read_cache()
     logger.debug("Database reset: all sessions and metadata deleted")
@@ -1,16 +1,17 @@
 import typer
 from pathlib import Path
+import signal
 import time
 from time_awareness import TimeAwareness
 
 app = typer.Typer()
 ta = None
 
-def get_ta():
+def get_ta(read_only: bool = False):
     global ta
     if ta is None:
         app_dir = Path.home() / ".time_awareness"
-        ta = TimeAwareness(app_dir)
+        ta = TimeAwareness(app_dir, read_only=read_only)
     return ta
 
 @app.command()
@@ -31,12 +32,14 @@ def stop():
 @app.command()
 def daemon():
     """Run the time awareness daemon."""
+    # Treat SIGTERM (logout, systemd stop) like Ctrl+C so the daemon ends and saves the current session
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
     get_ta()._daemon.run()
 
 @app.command()
 def history():
     """Print session history and stats."""
-    h = get_ta().history()
+    h = get_ta(read_only=True).history()
     typer.echo(f"Days tracked: {h['days']}")
     typer.echo(f"Total today: {h['total_today']}")
     typer.echo(f"Total yesterday: {h['total_yesterday']}")
@@ -51,7 +54,7 @@ def history():
 def current():
     """Show current session info."""
     try:
-        session_info = get_ta().current_session_info()
+        session_info = get_ta(read_only=True).current_session_info()
         if session_info is None:
             typer.echo("No active session.")
             return
@@ -68,7 +71,7 @@ def live(interval: float = 1.0):
     try:
         while True:
             try:
-                get_ta()._session_manager.load_state()  # Reload state to reflect daemon changes
+                get_ta(read_only=True)._session_manager.load_state()  # Reload state to reflect daemon changes
                 session_info = get_ta().current_session_info()
                 if session_info is None:
                     typer.echo("\r\033[KNo active session. Taking a break ...", nl=False)
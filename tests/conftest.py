@@ -3,7 +3,7 @@ from peewee import SqliteDatabase
 from loguru import logger
 import sys
 
-from database import database_proxy, Session, MetaData
+from database import database_proxy, invalidate_read_cache, Session, MetaData
 
 @pytest.fixture
 def enable_logging():
@@ -18,6 +18,7 @@ def use_in_memory_db(enable_logging):
     """Create an in-memory database for testing."""
     test_db = SqliteDatabase(':memory:', autoconnect=False)
     database_proxy.initialize(test_db)
+    invalidate_read_cache()
     test_db.connect()
     test_db.create_tables([Session, MetaData], safe=True)
     yield test_db
@@ -31,6 +31,7 @@ with patch.dict('sys.modules', {
     (datetime.timedelta(hours=2, minutes=15), "2h. 15m."),
     (datetime.timedelta(minutes=45), "45m."),
     (datetime.timedelta(hours=0, minutes=0), "0m."),
+    (datetime.timedelta(seconds=-0.5), "0m."),
 ])
 def test_format_duration(td, expected):
     assert format_duration(td) == expected
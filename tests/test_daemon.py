@@ -1,4 +1,5 @@
 import datetime
+import time
 import pytest
 
 import time_awareness
@@ -15,6 +16,7 @@ def fake_monitor():
     class FakeMonitor:
         def __init__(self):
             self.screen_locked = False
+            self.idle_time_available = False  # polls stay at poll_interval unless a test opts in
             self._uptime = 1000
             self._idle_time = datetime.timedelta(seconds=0)
             self.subscribe_lock_called = False
@@ -30,10 +32,13 @@ def fake_monitor():
             self.subscribe_lock_called = True
             return False
 
-        def subscribe_sleep_events(self):
+        def subscribe_sleep_events(self, handler=None):
             self.subscribe_sleep_called = True
             return None
 
+        def subscribe_idle_events(self, threshold_ms, handler=None):
+            return False
+
     return FakeMonitor()
 
 
@@ -102,10 +107,11 @@ def test_detects_reboot_and_ends_session(daemon, fake_monitor):
     daemon._is_active = True
     daemon._end_session_on_restart = True
     daemon._session_manager.start_session()
-    fake_monitor._idle_time = datetime.timedelta(minutes=20)
+    fake_monitor._idle_time = datetime.timedelta(seconds=0)  # stay active so only the reboot ends the session
 
     uptimes = [200, 50]  # decreasing => reboot
     fake_monitor.get_system_uptime = lambda: uptimes.pop(0)
+    daemon._handle_sleep_event(False)  # resume triggers the uptime re-check
 
     def fake_is_set():
         if not hasattr(fake_is_set, "called"):
@@ -119,6 +125,16 @@ def test_detects_reboot_and_ends_session(daemon, fake_monitor):
     assert daemon._session_manager.current_session is None
 
 
+def test_uptime_not_polled_without_resume(daemon, fake_monitor):
+    calls = []
+    fake_monitor.get_system_uptime = lambda: calls.append(1) or 1000
+    fake_monitor._idle_time = datetime.timedelta(seconds=0)
+    ticks = iter([False, False, False, True])
+    daemon._daemon_stop_event.is_set = lambda: next(ticks)
+    daemon.run(poll_interval=0, sleep_detection_threshold=100.0)
+    assert len(calls) == 1  # startup only
+
+
 # ------------------------------
 # idle detection
 # ------------------------------
@@ -160,6 +176,99 @@ def test_session_starts_when_user_active(daemon, fake_monitor):
     assert daemon._is_active
 
 
+def test_poll_backs_off_while_locked(daemon, fake_monitor):
+    fake_monitor.screen_locked = True
+    fake_monitor._idle_time = datetime.timedelta(minutes=20)
+    waits = []
+
+    def fake_wait(interval):
+        waits.append(interval)
+        if len(waits) == 5:
+            fake_monitor.screen_locked = False
+        if len(waits) == 6:
+            daemon._daemon_stop_event.set()
+
+    daemon._wait = fake_wait
+    daemon.run(poll_interval=5.0, sleep_detection_threshold=30.0, max_poll_interval=60.0)
+
+    assert waits == [10.0, 20.0, 40.0, 60.0, 60.0, 5.0]
+
+
+def test_poll_backs_off_while_idle_with_idle_events(daemon, fake_monitor):
+    fake_monitor._idle_time = datetime.timedelta(minutes=20)
+    fake_monitor.subscribe_idle_events = lambda threshold_ms, handler=None: True
+    daemon._session_manager.current_session = datetime.datetime.now()
+    waits = []
+
+    def fake_wait(interval):
+        waits.append(interval)
+        if len(waits) == 1:
+            daemon._handle_idle_event(True)  # the idle watch fired, so signals are being dispatched
+        if len(waits) == 4:
+            fake_monitor._idle_time = datetime.timedelta(seconds=1)
+            daemon._handle_idle_event(False)
+        if len(waits) == 5:
+            daemon._daemon_stop_event.set()
+
+    daemon._wait = fake_wait
+    daemon.run(poll_interval=5.0, sleep_detection_threshold=30.0, max_poll_interval=60.0)
+
+    assert waits == [5.0, 10.0, 20.0, 40.0, 5.0]
+    assert daemon._is_active
+
+
+def test_poll_stays_fast_when_idle_watches_never_fire(daemon, fake_monitor):
+    # e.g. the CLI daemon: watches are added but no main loop delivers them
+    fake_monitor._idle_time = datetime.timedelta(minutes=20)
+    fake_monitor.subscribe_idle_events = lambda threshold_ms, handler=None: True
+    daemon._session_manager.current_session = datetime.datetime.now()
+    waits = []
+
+    def fake_wait(interval):
+        waits.append(interval)
+        if len(waits) == 3:
+            daemon._daemon_stop_event.set()
+
+    daemon._wait = fake_wait
+    daemon.run(poll_interval=5.0, sleep_detection_threshold=30.0, max_poll_interval=60.0)
+
+    assert waits == [5.0, 5.0, 5.0]
+
+
+def test_active_poll_waits_until_idle_threshold(daemon, fake_monitor):
+    fake_monitor.idle_time_available = True
+    daemon._end_session_idle_threshold = datetime.timedelta(minutes=10)
+    idle_times = [datetime.timedelta(minutes=9, seconds=40), datetime.timedelta(minutes=9, seconds=58),
+                  datetime.timedelta(0)]
+    fake_monitor.get_idle_time = lambda: idle_times[min(len(waits), len(idle_times) - 1)]
+    waits = []
+
+    def fake_wait(interval):
+        waits.append(interval)
+        if len(waits) == 3:
+            daemon._daemon_stop_event.set()
+
+    daemon._wait = fake_wait
+    daemon.run(poll_interval=5.0, sleep_detection_threshold=30.0, max_poll_interval=60.0)
+
+    assert waits == [20.0, 5.0, 60.0]
+
+
+def test_active_poll_stays_fast_without_idle_reader(daemon, fake_monitor):
+    fake_monitor.idle_time_available = False
+    waits = []
+
+    def fake_wait(interval):
+        waits.append(interval)
+        if len(waits) == 2:
+            daemon._daemon_stop_event.set()
+
+    daemon._wait = fake_wait
+    daemon.run(poll_interval=5.0, sleep_detection_threshold=30.0, max_poll_interval=60.0)
+
+    assert waits == [5.0, 5.0]
+
+
 # ------------------------------
 # stop()
 # ------------------------------
@@ -171,6 +280,49 @@ def test_stop_cleans_up(daemon, fake_monitor):
     assert not daemon._is_active or daemon._session_manager.current_session is None
 
 
+def test_lock_events_are_debounced(daemon, monkeypatch):
+    applied = []
+    monkeypatch.setattr(daemon, "_apply_lock_event", lambda locked, event_time: applied.append(locked))
+    daemon._lock_debounce = 0.05
+    for locked in (True, False, True):
+        daemon._handle_lock_event(locked)
+    daemon._lock_timer.join(timeout=1.0)
+    assert applied == [True]
+
+
+def test_apply_lock_event_ends_session_at_signal_time(daemon):
+    daemon._is_active = True
+    daemon._session_manager.current_session = datetime.datetime.now() - datetime.timedelta(minutes=10)
+    event_time = datetime.datetime.now() - datetime.timedelta(minutes=5)
+    duration = []
+    daemon._session_manager.end_session = lambda now=None: duration.append(now)
+    daemon._apply_lock_event(True, event_time)
+    assert duration == [event_time]
+    assert not daemon._is_active
+
+
+def test_last_seen_time_writes_are_throttled(daemon, monkeypatch):
+    writes = []
+    monkeypatch.setattr(time_awareness, "set_metadata", lambda key, value: writes.append(key))
+    clock = [1000.0]
+    monkeypatch.setattr(time_awareness.time, "monotonic", lambda: clock[0])
+
+    daemon._touch_last_seen()
+    daemon._touch_last_seen()
+    clock[0] += 61
+    daemon._touch_last_seen()
+    daemon.stop()  # always writes
+    assert writes.count("last_seen_time") == 3
+
+
+def test_wait_returns_early_when_woken(daemon):
+    daemon._handle_sleep_event(False)
+    started = time.monotonic()
+    daemon._wait(poll_interval=5.0)
+    assert time.monotonic() - started < 1.0
+    assert not daemon._wake_event.is_set()
+
+
 # ------------------------------
 # new helper methods
 # ------------------------------
@@ -1,9 +1,12 @@
 import pytest
 import datetime
+import threading
+
+from database import database_proxy, Session
 
 from database import (
-    save_session, get_sessions, set_metadata, get_metadata,
-    get_sessions_since, get_sessions_by_weekday, get_sessions_for_day,
+    configure_database, checkpoint_database, with_database, cached_read, save_session, save_sessions, get_sessions, get_all_sessions_raw, get_latest_sessions_raw, set_metadata, set_metadata_bulk, get_metadata,
+    get_sessions_since, get_sessions_by_weekday, get_weekday_totals, get_aggregate_stats, get_sessions_for_day,
     get_previous_session, get_days_tracked
 )
 
@@ -22,11 +25,34 @@ def test_save_and_get_session():
     assert sessions[0][1] == end
     assert sessions[0][2] == duration
 
+def test_save_sessions_batches_in_one_transaction():
+    start = datetime.datetime(2024, 6, 1, 10, 0, 0)
+    sessions = [
+        (start + datetime.timedelta(hours=i), start + datetime.timedelta(hours=i, minutes=30),
+         datetime.timedelta(minutes=30))
+        for i in range(250)
+    ]
+    assert save_sessions(sessions)
+    assert get_sessions(return_count=True) == 250
+    assert get_sessions()[-1] == sessions[0]
+
 def test_metadata():
     set_metadata("foo", "bar")
     assert get_metadata("foo") == "bar"
     assert get_metadata("missing", "default") == "default"
 
+def test_set_metadata_overwrites_existing_key():
+    set_metadata("foo", "bar")
+    set_metadata("foo", 42)
+    assert get_metadata("foo") == "42"
+
+def test_set_metadata_bulk():
+    set_metadata("foo", "bar")
+    assert get_metadata("foo") == "bar"
+    assert set_metadata_bulk({"foo": 1, "baz": "qux"})
+    assert get_metadata("foo") == "1"
+    assert get_metadata("baz") == "qux"
+
 def test_get_sessions_since():
     now = datetime.datetime(2024, 6, 1, 10, 0, 0)
     save_session(now, now + datetime.timedelta(hours=1), datetime.timedelta(hours=1))
@@ -42,6 +68,32 @@ def test_get_sessions_by_weekday():
     weekday_histories = get_sessions_by_weekday()
     assert monday.weekday() in weekday_histories
     assert tuesday.weekday() in weekday_histories
+    assert weekday_histories[monday.weekday()] == [datetime.timedelta(hours=2)]
+    assert weekday_histories[tuesday.weekday()] == [datetime.timedelta(hours=1)]
+
+def test_get_weekday_totals():
+    monday = datetime.datetime(2024, 6, 3, 10, 0, 0)
+    sunday = datetime.datetime(2024, 6, 9, 10, 0, 0)
+    save_session(monday, monday + datetime.timedelta(hours=2), datetime.timedelta(hours=2))
+    save_session(monday + datetime.timedelta(days=7), monday + datetime.timedelta(days=7, hours=1), datetime.timedelta(hours=1))
+    save_session(sunday, sunday + datetime.timedelta(hours=1), datetime.timedelta(hours=1))
+    assert get_weekday_totals() == {0: (3 * 3600, 2), 6: (3600, 1)}
+
+def test_get_aggregate_stats():
+    day = datetime.datetime(2024, 6, 3, 10, 0, 0)
+    save_session(day, day + datetime.timedelta(hours=2), datetime.timedelta(hours=2))
+    save_session(day + datetime.timedelta(hours=5), day + datetime.timedelta(hours=6), datetime.timedelta(hours=1))
+    save_session(day - datetime.timedelta(days=10), day - datetime.timedelta(days=10, minutes=-30),
+                 datetime.timedelta(minutes=30))
+    stats = get_aggregate_stats(day.date(), day - datetime.timedelta(days=7))
+    assert stats == {
+        "days": 2,
+        "sessions": 3,
+        "total": 3.5 * 3600,
+        "day_total": 3 * 3600,
+        "since_total": 3 * 3600,
+        "since_days": 1,
+    }
 
 def test_get_sessions():
     start = datetime.datetime(2024, 6, 1, 10, 0, 0)
@@ -58,6 +110,12 @@ def test_get_sessions_for_day():
     sessions = get_sessions_for_day(day)
     assert len(sessions) == 1
 
+def test_get_sessions_for_day_excludes_next_midnight():
+    midnight = datetime.datetime(2024, 6, 2)
+    save_session(midnight, midnight + datetime.timedelta(minutes=5), datetime.timedelta(minutes=5))
+    assert get_sessions_for_day(datetime.date(2024, 6, 1)) == []
+    assert len(get_sessions_for_day(datetime.date(2024, 6, 2))) == 1
+
 def test_get_previous_session():
     start = datetime.datetime(2024, 6, 1, 10, 0, 0)
     end = datetime.datetime(2024, 6, 1, 11, 0, 0)
@@ -66,9 +124,86 @@ def test_get_previous_session():
     assert prev[0] == start
     assert prev[1] == end
 
+def test_get_previous_session_returns_latest():
+    earlier = datetime.datetime(2024, 6, 1, 10, 0, 0)
+    later = datetime.datetime(2024, 6, 2, 9, 30, 15, 123456)
+    save_session(later, later + datetime.timedelta(minutes=5), datetime.timedelta(minutes=5))
+    save_session(earlier, earlier + datetime.timedelta(hours=1), datetime.timedelta(hours=1))
+    assert get_previous_session() == (later, later + datetime.timedelta(minutes=5), datetime.timedelta(minutes=5))
+
 def test_get_days_tracked():
     day1 = datetime.datetime(2024, 6, 1, 10, 0, 0)
     day2 = datetime.datetime(2024, 6, 2, 10, 0, 0)
     save_session(day1, day1 + datetime.timedelta(hours=1), datetime.timedelta(hours=1))
     save_session(day2, day2 + datetime.timedelta(hours=1), datetime.timedelta(hours=1))
+    save_session(day2 + datetime.timedelta(hours=3), day2 + datetime.timedelta(hours=4), datetime.timedelta(hours=1))
+    assert get_days_tracked() == 2
+
+def test_get_all_sessions_raw():
+    later = datetime.datetime(2024, 6, 2, 10, 0, 0)
+    earlier = datetime.datetime(2024, 6, 1, 10, 0, 0)
+    save_session(later, later + datetime.timedelta(hours=1), datetime.timedelta(hours=1))
+    save_session(earlier, earlier + datetime.timedelta(hours=2), datetime.timedelta(hours=2))
+    rows = get_all_sessions_raw()
+    assert rows == [
+        (earlier, earlier + datetime.timedelta(hours=2), 7200.0),
+        (later, later + datetime.timedelta(hours=1), 3600.0),
+    ]
+
+def test_get_latest_sessions_raw():
+    starts = [datetime.datetime(2024, 6, day, 10, 0, 0) for day in (1, 3, 2)]
+    for start in starts:
+        save_session(start, start + datetime.timedelta(hours=1), datetime.timedelta(hours=1))
+    rows = get_latest_sessions_raw(2)
+    assert [row[0] for row in rows] == [datetime.datetime(2024, 6, 3, 10), datetime.datetime(2024, 6, 2, 10)]
+
+def test_configure_database_enables_wal(tmp_path):
+    db = configure_database(tmp_path / "test.sqlite")
+    assert db.execute_sql("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert db.execute_sql("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert db.execute_sql("PRAGMA wal_autocheckpoint").fetchone()[0] == 0
+    assert checkpoint_database()
+    db.close()
+
+def test_cached_reads_invalidated_by_writes(monkeypatch):
+    day = datetime.datetime(2024, 6, 1, 10, 0, 0)
+    save_session(day, day + datetime.timedelta(hours=1), datetime.timedelta(hours=1))
+    assert get_days_tracked() == 1
+
+    # A cached result is served without touching the sessions table again
+    monkeypatch.setattr(Session, "select", lambda *a, **kw: pytest.fail("query was not cached"))
+    assert get_days_tracked() == 1
+    monkeypatch.undo()
+
+    save_session(day + datetime.timedelta(days=1), day + datetime.timedelta(days=1, hours=1), datetime.timedelta(hours=1))
     assert get_days_tracked() == 2
+
+def test_cached_read_only_caches_the_long_lived_connection(tmp_path):
+    db = configure_database(tmp_path / "test.sqlite")
+    calls = []
+
+    @with_database
+    @cached_read
+    def read():
+        calls.append(threading.current_thread())
+        return len(calls)
+
+    read()
+    read()
+    assert len(calls) == 1
+    # Threads without a connection get one per call, whose data_version can't be compared with a cached one
+    for _ in range(2):
+        reader = threading.Thread(target=read)
+        reader.start()
+        reader.join()
+    assert len(calls) == 3
+    assert read.cache_info().currsize == 1
+    db.close()
+
+def test_session_range_queries_use_covering_index():
+    query = Session.select(Session.start, Session.end, Session.duration).where(
+        Session.start >= datetime.datetime(2024, 6, 1)
+    ).order_by(Session.start)
+    sql, params = query.sql()
+    plan = database_proxy.execute_sql(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    assert any("COVERING INDEX session_start_end_duration" in row[-1] for row in plan)
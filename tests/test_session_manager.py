@@ -1,6 +1,8 @@
 import datetime
+import threading
 import pytest
 import time_awareness
+from database import get_sessions
 
 
 @pytest.fixture
@@ -25,6 +27,15 @@ def test_start_and_end_session(manager):
     assert manager.today_total > 0
 
 
+def test_end_session_uses_monotonic_duration_after_clock_step(manager, monkeypatch):
+    # Session started "an hour from now": the wall clock has since stepped back an hour
+    start = datetime.datetime.now() + datetime.timedelta(hours=1)
+    manager.current_session = start
+    manager._session_clock = (start, time_awareness.time.monotonic() - 120)
+    duration = manager.end_session()
+    assert 119 <= duration.total_seconds() <= 125
+
+
 def test_end_session_without_start(manager):
     result = manager.end_session()
     assert result is None
@@ -64,17 +75,47 @@ def test_end_session_at_without_start(manager):
     assert duration is None
 
 
+def test_failed_session_save_keeps_session_open(manager, monkeypatch):
+    start = datetime.datetime.now() - datetime.timedelta(hours=1)
+    manager.current_session = start
+    monkeypatch.setattr(time_awareness, "save_sessions", lambda sessions: False)
+    assert manager.end_session_at(start + datetime.timedelta(minutes=10)) is None
+    assert manager.current_session == start
+    assert manager._pending_sessions == []
+
+    monkeypatch.undo()
+    manager.end_session_at(start + datetime.timedelta(minutes=30))
+    assert manager.current_session is None
+    sessions = get_sessions(return_count=False)
+    assert len(sessions) == 1
+    assert sessions[0][2] == datetime.timedelta(minutes=30)
+
+
+def test_session_kept_when_flush_raises(manager, monkeypatch):
+    manager.start_session()
+    start = manager.current_session
+
+    def failing_save(sessions):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(time_awareness, "save_sessions", failing_save)
+    assert manager.end_session(start + datetime.timedelta(minutes=5)) is None
+    assert manager.current_session == start
+    assert manager._pending_sessions == []
+    assert manager.today_total == 0
+
+
 # ------------------------------
 # save_state / load_state
 # ------------------------------
 def test_save_and_load_state_respects_interval(manager, monkeypatch):
-    # capture calls to set_metadata
+    # capture metadata writes
     calls = []
 
-    def fake_set_metadata(key, value):
-        calls.append((key, value))
+    def fake_set_metadata_bulk(values):
+        calls.extend(values.items())
 
-    monkeypatch.setattr(time_awareness, "set_metadata", fake_set_metadata)
+    monkeypatch.setattr(time_awareness, "set_metadata_bulk", fake_set_metadata_bulk)
 
     # freeze time
     now = [1000.0]
@@ -97,6 +138,48 @@ def test_save_and_load_state_respects_interval(manager, monkeypatch):
     assert any(key == "today_total" for key, _ in calls)
 
 
+def test_forced_save_state_ignores_interval(manager, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time_awareness.time, "time", lambda: now[0])
+    manager.today_total = 42
+    manager.save_state()
+
+    manager.today_total = 60
+    manager.save_state()
+    assert time_awareness.get_metadata("today_total") == "42"
+    manager.save_state(force=True)
+    assert time_awareness.get_metadata("today_total") == "60"
+
+
+def test_save_state_skips_unchanged_values(manager, monkeypatch):
+    calls = []
+    real_set_metadata_bulk = time_awareness.set_metadata_bulk
+
+    def spy_set_metadata_bulk(values):
+        calls.extend(values)
+        return real_set_metadata_bulk(values)
+
+    monkeypatch.setattr(time_awareness, "set_metadata_bulk", spy_set_metadata_bulk)
+    now = [1000.0]
+    monkeypatch.setattr(time_awareness.time, "time", lambda: now[0])
+
+    manager.today_total = 42
+    manager._last_update_date = datetime.date.today()
+    manager.save_state()
+    assert len(calls) == 3
+
+    calls.clear()
+    now[0] += 31
+    manager.save_state()
+    assert calls == []
+
+    now[0] += 31
+    manager.today_total = 50
+    manager.save_state()
+    assert calls == ["today_total"]
+    assert time_awareness.get_metadata("today_total") == "50"
+
+
 
 # ------------------------------
 # check_day_rollover
@@ -124,6 +207,37 @@ def test_check_day_rollover_no_previous(manager):
     assert manager._last_update_date == datetime.date.today()
 
 
+def test_check_day_rollover_uses_last_saved_session(manager, monkeypatch):
+    today = datetime.date(2024, 6, 2)
+    midnight = datetime.datetime.combine(today, datetime.time.min)
+    manager.current_session = midnight - datetime.timedelta(minutes=30)
+    manager.end_session_at(midnight + datetime.timedelta(minutes=5))
+    manager._last_update_date = today - datetime.timedelta(days=1)
+    monkeypatch.setattr(time_awareness, "get_previous_session",
+                        lambda verbose=True: pytest.fail("saved session end should be reused"))
+
+    manager.check_day_rollover(today)
+    assert manager.today_total == 300
+
+
+def test_check_day_rollover_waits_for_lock(manager, monkeypatch):
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    manager.today_total = 50
+    manager._last_update_date = yesterday
+    manager._last_saved_session_end = datetime.datetime.combine(yesterday, datetime.time(9))
+    monkeypatch.setattr(manager, "save_state", lambda force=False: None)
+
+    with manager._lock:
+        rollover = threading.Thread(target=manager.check_day_rollover)
+        rollover.start()
+        rollover.join(timeout=0.2)
+        assert rollover.is_alive()  # blocked until the lock holder is done
+        assert manager._last_update_date == yesterday
+    rollover.join(timeout=5)
+    assert manager.today_total == 0
+    assert manager._last_update_date == datetime.date.today()
+
+
 # ------------------------------
 # reset
 # ------------------------------
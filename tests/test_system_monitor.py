@@ -1,7 +1,9 @@
+import ctypes
 import datetime
-import builtins
 import pytest
 import sys
+import threading
+import time
 
 import time_awareness
 
@@ -14,20 +16,36 @@ def monitor():
 # ------------------------------
 # get_system_uptime
 # ------------------------------
-def test_get_system_uptime_linux(monkeypatch, monitor):
+def test_get_system_uptime_linux_boottime(monkeypatch, monitor):
     monkeypatch.setattr(sys, "platform", "linux")
+    monkeypatch.setattr(time_awareness.time, "CLOCK_BOOTTIME", 7, raising=False)
+    monkeypatch.setattr(time_awareness.time, "clock_gettime", lambda clock: 1234.56 if clock == 7 else 0.0)
+    monkeypatch.setattr(time_awareness.os, "open", lambda *a: pytest.fail("/proc/uptime should not be opened"))
+    assert monitor.get_system_uptime() == 1234.56
+
 
-    class FakeFile:
-        def __enter__(self): return self
-        def __exit__(self, *a): return False
-        def readline(self): return "1234.56 654321\n"
+def test_get_system_uptime_linux(monkeypatch, monitor):
+    monkeypatch.setattr(sys, "platform", "linux")
+    monkeypatch.delattr(time_awareness.time, "CLOCK_BOOTTIME", raising=False)  # exercise the /proc/uptime fallback
+    opened = []
 
-    def fake_open(path, *args, **kwargs):
+    def fake_open(path, flags):
         assert path == "/proc/uptime"
-        return FakeFile()
+        opened.append(path)
+        return 42
 
-    monkeypatch.setattr(builtins, "open", lambda path, *a, **k: fake_open(path))
+    def fake_pread(fd, size, offset):
+        assert (fd, offset) == (42, 0)
+        return b"1234.56 654321\n"
+
+    monkeypatch.setattr(time_awareness.os, "open", fake_open)
+    monkeypatch.setattr(time_awareness.os, "pread", fake_pread)
+    monkeypatch.setattr(time_awareness.os, "close", lambda fd: None)
+    assert monitor.get_system_uptime() == 1234.56
     assert monitor.get_system_uptime() == 1234.56
+    assert len(opened) == 1  # the descriptor is reused across polls
+    monitor.close()
+    assert monitor._uptime_fd is None
 
 
 def test_get_system_uptime_darwin(monkeypatch, monitor):
@@ -43,11 +61,37 @@ def test_get_system_uptime_darwin(monkeypatch, monitor):
     assert pytest.approx(result, rel=1e-3) == 1000
 
 
+def test_get_system_uptime_darwin_reads_boottime_once(monkeypatch, monitor):
+    monkeypatch.setattr(sys, "platform", "darwin")
+    calls = []
+
+    def fake_check_output(cmd):
+        calls.append(cmd)
+        return b"{ sec = 1000, usec = 0 } Thu Jan  1 01:16:40 1970"
+
+    monkeypatch.setattr(time_awareness.subprocess, "check_output", fake_check_output)
+    now = [2000]
+    monkeypatch.setattr(time_awareness.time, "time", lambda: now[0])
+
+    assert monitor.get_system_uptime() == 1000
+    now[0] = 2500
+    assert monitor.get_system_uptime() == 1500
+    assert len(calls) == 1
+
+
 def test_get_system_uptime_unsupported(monkeypatch, monitor):
     monkeypatch.setattr(sys, "platform", "win32")
     assert monitor.get_system_uptime() == 0.0
 
 
+def test_get_system_uptime_resolves_platform_once(monkeypatch, monitor):
+    monkeypatch.setattr(sys, "platform", "win32")
+    assert monitor.get_system_uptime() == 0.0
+    monkeypatch.setattr(sys, "platform", "linux")
+    monkeypatch.setattr(monitor, "_get_system_uptime_linux", lambda: 1234.56)
+    assert monitor.get_system_uptime() == 0.0
+
+
 # ------------------------------
 # get_idle_time
 # ------------------------------
@@ -66,8 +110,21 @@ def test_get_idle_time_linux_none(monkeypatch, monitor):
     assert monitor.get_idle_time() == datetime.timedelta(seconds=0)
 
 
+def test_get_idle_time_linux_warns_once(monkeypatch, monitor):
+    monkeypatch.setattr(sys, "platform", "linux")
+    warnings = []
+    monkeypatch.setattr(time_awareness.logger, "warning", lambda msg, *a: warnings.append(msg))
+    results = [None, None, datetime.timedelta(seconds=3), None]
+    monkeypatch.setattr(monitor, "_get_idle_time_linux", lambda: results.pop(0))
+
+    for _ in range(4):
+        monitor.get_idle_time()
+    assert len(warnings) == 2  # once when it went away, once more after it came back and went away again
+
+
 def test_get_idle_time_darwin(monkeypatch, monitor):
     monkeypatch.setattr(sys, "platform", "darwin")
+    monkeypatch.setattr(time_awareness, "_load_iokit_idle_reader", lambda: None)  # exercise the ioreg fallback
 
     def fake_check_output(cmd):
         return b"HIDIdleTime = 2000000000;"
@@ -78,6 +135,14 @@ def test_get_idle_time_darwin(monkeypatch, monitor):
     assert result.total_seconds() == 2
 
 
+def test_get_idle_time_darwin_iokit(monkeypatch, monitor):
+    monkeypatch.setattr(sys, "platform", "darwin")
+    monkeypatch.setattr(time_awareness, "_load_iokit_idle_reader", lambda: lambda: 3_500_000_000)
+    monkeypatch.setattr(time_awareness.subprocess, "check_output",
+                        lambda cmd: pytest.fail("ioreg should not be spawned"))
+    assert monitor.get_idle_time() == datetime.timedelta(seconds=3.5)
+
+
 def test_get_idle_time_unsupported(monkeypatch, monitor):
     monkeypatch.setattr(sys, "platform", "win32")
     assert monitor.get_idle_time() == datetime.timedelta(seconds=0)
@@ -121,11 +186,107 @@ def test__get_idle_time_linux_with_screensaver(monkeypatch, monitor):
     assert result.total_seconds() == 5
 
 
+def test__get_idle_time_linux_reuses_proxy(monkeypatch, monitor):
+    buses = []
+
+    class FakeBus:
+        def __init__(self):
+            buses.append(self)
+
+        def get(self, name, path):
+            return FakeIface(1000000)
+
+    monkeypatch.setattr(time_awareness, "SessionBus", FakeBus)
+    for _ in range(3):
+        assert monitor._get_idle_time_linux().total_seconds() > 0
+    assert len(buses) == 1
+
+
+def test_idle_polls_and_watches_share_bus_and_proxy(monkeypatch, monitor):
+    buses, proxies = [], []
+
+    class FakeIdleMonitor(FakeIface):
+        def AddIdleWatch(self, interval_ms):
+            return 1
+
+    class FakeBus:
+        def __init__(self):
+            buses.append(self)
+
+        def get(self, name, path):
+            proxies.append(name)
+            return FakeIdleMonitor(1000000)
+
+    monkeypatch.setattr(time_awareness, "SessionBus", FakeBus)
+    assert monitor.subscribe_idle_events(600000)
+    assert monitor._get_idle_time_linux().total_seconds() > 0
+    assert len(buses) == 1
+    assert proxies == ["org.gnome.Mutter.IdleMonitor"]
+
+
+def test_get_idle_time_resolves_platform_once(monkeypatch, monitor):
+    monkeypatch.setattr(sys, "platform", "win32")
+    assert monitor.get_idle_time() == datetime.timedelta(seconds=0)
+    monkeypatch.setattr(sys, "platform", "linux")
+    monkeypatch.setattr(monitor, "_get_idle_time_linux", lambda: datetime.timedelta(seconds=42))
+    assert monitor.get_idle_time() == datetime.timedelta(seconds=0)
+
+
 def test__get_idle_time_linux_none(monkeypatch, monitor):
     monkeypatch.setattr(time_awareness, "SessionBus", lambda: (_ for _ in ()).throw(Exception("fail")))
+    monkeypatch.setattr(time_awareness, "_load_xss_idle_reader", lambda: None)
     assert monitor._get_idle_time_linux() is None
 
 
+def test__get_idle_time_linux_falls_back_to_xss(monkeypatch, monitor):
+    monkeypatch.setattr(time_awareness, "SessionBus", lambda: (_ for _ in ()).throw(Exception("fail")))
+    loads = []
+    monkeypatch.setattr(time_awareness, "_load_xss_idle_reader", lambda: loads.append(1) or (lambda: 1500))
+    assert monitor._get_idle_time_linux() == datetime.timedelta(milliseconds=1500)
+    monitor._idle_reader = None
+    assert monitor._get_idle_time_linux() == datetime.timedelta(milliseconds=1500)
+    assert len(loads) == 1  # display opened once
+
+
+def test_xss_idle_reader_serialises_display_access(monkeypatch):
+    info = time_awareness._XScreenSaverInfo(idle=1500)
+    in_query = threading.Event()
+    overlaps = []
+
+    class FakeFunc:
+        def __init__(self, impl):
+            self.impl = impl
+
+        def __call__(self, *args):
+            return self.impl(*args)
+
+    def query(display, root, info_ptr):
+        overlaps.append(in_query.is_set())
+        in_query.set()
+        time.sleep(0.01)
+        in_query.clear()
+        return 1
+
+    class FakeLib:
+        XOpenDisplay = FakeFunc(lambda name: 1)
+        XDefaultRootWindow = FakeFunc(lambda display: 2)
+        XScreenSaverAllocInfo = FakeFunc(lambda: ctypes.pointer(info))
+        XScreenSaverQueryInfo = FakeFunc(query)
+
+    monkeypatch.setenv("DISPLAY", ":0")
+    monkeypatch.setattr(time_awareness.ctypes.util, "find_library", lambda name: name)
+    monkeypatch.setattr(time_awareness.ctypes, "CDLL", lambda path: FakeLib)
+    read_idle_ms = time_awareness._load_xss_idle_reader()
+
+    readers = [threading.Thread(target=read_idle_ms) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    assert read_idle_ms() == 1500
+    assert not any(overlaps)
+
+
 # ------------------------------
 # subscribe_lock_events
 # ------------------------------
@@ -164,6 +325,46 @@ def test_subscribe_lock_events_failure(monkeypatch, monitor):
     assert result is False
 
 
+# ------------------------------
+# subscribe_idle_events
+# ------------------------------
+def test_subscribe_idle_events_mutter(monkeypatch, monitor):
+    class FakeIdleMonitor:
+        def __init__(self):
+            self.onWatchFired = None
+            self.active_watches = 0
+
+        def AddIdleWatch(self, interval_ms):
+            assert interval_ms == 600000
+            return 1
+
+        def AddUserActiveWatch(self):
+            self.active_watches += 1
+            return 100 + self.active_watches
+
+    idle_monitor = FakeIdleMonitor()
+
+    class FakeBus:
+        def get(self, name, path):
+            assert name == "org.gnome.Mutter.IdleMonitor"
+            return idle_monitor
+
+    monkeypatch.setattr(time_awareness, "SessionBus", lambda: FakeBus())
+    events = []
+    assert monitor.subscribe_idle_events(600000, events.append)
+
+    idle_monitor.onWatchFired(101)  # no active watch armed yet
+    idle_monitor.onWatchFired(1)
+    idle_monitor.onWatchFired(101)
+    assert events == [True, False]
+    assert idle_monitor.active_watches == 1
+
+
+def test_subscribe_idle_events_failure(monkeypatch, monitor):
+    monkeypatch.setattr(time_awareness, "SessionBus", lambda: (_ for _ in ()).throw(Exception("fail")))
+    assert monitor.subscribe_idle_events(600000) is False
+
+
 # ------------------------------
 # subscribe_sleep_events
 # ------------------------------
@@ -183,3 +384,26 @@ def test_subscribe_sleep_events_success(monkeypatch, monitor):
 def test_subscribe_sleep_events_failure(monkeypatch, monitor):
     monkeypatch.setattr(time_awareness, "SystemBus", lambda: (_ for _ in ()).throw(Exception("fail")))
     monitor.subscribe_sleep_events()  # should not raise
+
+
+def test_pydbus_imported_on_first_use(monkeypatch):
+    class FakePydbus:
+        SessionBus = object()
+        SystemBus = object()
+
+    monkeypatch.setitem(sys.modules, "pydbus", FakePydbus)
+    monkeypatch.setattr(time_awareness, "_pydbus_loaded", False)
+    monkeypatch.setattr(time_awareness, "SessionBus", None)
+    monkeypatch.setattr(time_awareness, "SystemBus", None)
+    time_awareness._load_pydbus()
+    assert time_awareness.SessionBus is FakePydbus.SessionBus
+    assert time_awareness.SystemBus is FakePydbus.SystemBus
+
+
+def test_idle_time_available_tracks_reader(monitor):
+    monitor._idle_time_fct = lambda: datetime.timedelta(seconds=3)
+    monitor.get_idle_time()
+    assert monitor.idle_time_available
+    monitor._idle_time_fct = monitor._get_idle_time_unsupported
+    monitor.get_idle_time()
+    assert not monitor.idle_time_available
@@ -1,7 +1,9 @@
 import datetime
+import threading
 import pytest
 
 import time_awareness
+from database import save_session, get_sessions
 
 
 @pytest.fixture
@@ -52,6 +54,21 @@ def test_total_time_today_and_yesterday(app):
     assert isinstance(yesterday, datetime.timedelta)
 
 
+def test_total_time_today_rolls_over_without_daemon(app):
+    app._session_manager.today_total = 500
+    app._session_manager._last_update_date = datetime.date.today() - datetime.timedelta(days=1)
+    assert app.total_time_today() == datetime.timedelta()
+    assert app._session_manager._last_update_date == datetime.date.today()
+
+
+def test_total_time_yesterday_sums_yesterdays_sessions(app):
+    yesterday = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=1), datetime.time(9))
+    save_session(yesterday, yesterday + datetime.timedelta(minutes=30), datetime.timedelta(minutes=30))
+    later = yesterday + datetime.timedelta(hours=2)
+    save_session(later, later + datetime.timedelta(minutes=15), datetime.timedelta(minutes=15))
+    assert app.total_time_yesterday() == datetime.timedelta(minutes=45)
+
+
 def test_seven_day_average_and_weekday_average(app):
     avg7 = app.seven_day_average()
     avgw = app.weekday_average()
@@ -74,6 +91,44 @@ def test_history_returns_dict(app):
     assert "sessions" in hist
 
 
+def test_history_matches_individual_stats(app):
+    now = datetime.datetime.now()
+    for days_ago, minutes in [(1, 30), (1, 60), (3, 45), (10, 90)]:
+        start = now - datetime.timedelta(days=days_ago)
+        save_session(start, start + datetime.timedelta(minutes=minutes),
+                                    datetime.timedelta(minutes=minutes))
+
+    hist = app.history()
+    assert hist["days"] == app.days_tracked()
+    assert hist["total_yesterday"] == app.total_time_yesterday()
+    assert hist["seven_day_average"] == app.seven_day_average()
+    assert hist["weekday_average"] == app.weekday_average()
+    assert hist["total_average"] == app.total_average()
+    assert hist["sessions"] == get_sessions()
+
+
+def test_history_limit_returns_latest_sessions(app):
+    start = datetime.datetime(2024, 6, 1, 10, 0, 0)
+    for day in range(3):
+        begin = start + datetime.timedelta(days=day)
+        save_session(begin, begin + datetime.timedelta(minutes=30), datetime.timedelta(minutes=30))
+    hist = app.history(limit=2)
+    assert hist["session_count"] == 3
+    assert hist["sessions"] == app.history()["sessions"][:2]
+
+
+def test_history_reuses_cached_aggregates(app):
+    start = datetime.datetime.now() - datetime.timedelta(days=1)
+    save_session(start, start + datetime.timedelta(minutes=30), datetime.timedelta(minutes=30))
+
+    hits = time_awareness.get_aggregate_stats.cache_info().hits
+    first = app.history(count_sessions=True)
+    # Three calls so a minute boundary between two of them still leaves one cache hit
+    assert app.history(count_sessions=True) == first
+    assert app.history(count_sessions=True) == first
+    assert time_awareness.get_aggregate_stats.cache_info().hits > hits
+
+
 # ------------------------------
 # Reset
 # ------------------------------
@@ -96,3 +151,65 @@ def test_daemon_thread_start_and_stop(tmp_path, use_in_memory_db):
     app = time_awareness.TimeAwareness(app_dir=tmp_path, start_daemon=True, log_to_terminal=True)
     assert app._daemon_thread.is_alive()
     app.stop_daemon()
+
+
+def test_session_changes_wake_running_daemon(tmp_path, use_in_memory_db, monkeypatch):
+    wakes = []
+    monkeypatch.setattr(time_awareness.Daemon, "wake", lambda self: wakes.append(self))
+    app = time_awareness.TimeAwareness(app_dir=tmp_path, start_daemon=True, log_to_terminal=True)
+    app.start_session()
+    app.end_session()
+    app.stop_daemon()
+    assert wakes == [app._daemon, app._daemon]
+
+
+def test_total_time_today_leaves_rollover_to_running_daemon(tmp_path, use_in_memory_db, monkeypatch):
+    app = time_awareness.TimeAwareness(app_dir=tmp_path, start_daemon=True, log_to_terminal=True)
+    callers = []
+    monkeypatch.setattr(app._session_manager, "check_day_rollover",
+                        lambda today=None: callers.append(threading.current_thread()))
+    app.total_time_today()
+    app.stop_daemon()
+    assert threading.current_thread() not in callers
+
+
+def test_read_only_app_rejects_writes(tmp_path, use_in_memory_db):
+    writer = time_awareness.TimeAwareness(app_dir=tmp_path, log_to_terminal=True)
+    writer.start_session()
+    writer.end_session()
+    sessions = writer.history()["sessions"]
+    writer.close()
+
+    reader = time_awareness.TimeAwareness(app_dir=tmp_path, log_to_terminal=True, read_only=True)
+    assert reader.history()["sessions"] == sessions
+    now = datetime.datetime.now()
+    assert not save_session(now, now, datetime.timedelta())
+    reader.close()
+
+
+def test_close_persists_throttled_state(tmp_path, use_in_memory_db):
+    app = time_awareness.TimeAwareness(app_dir=tmp_path, log_to_terminal=True)
+    app.start_session()
+    app.end_session()  # within the save interval of start_session's save, so throttled
+    app.close()
+
+    reopened = time_awareness.TimeAwareness(app_dir=tmp_path, log_to_terminal=True, read_only=True)
+    assert reopened._session_manager.today_total > 0
+    assert reopened._session_manager.current_session is None
+    reopened.close()
+
+
+def test_log_sink_added_once_per_path(tmp_path, use_in_memory_db, monkeypatch):
+    added = []
+    real_add = time_awareness.logger.add
+
+    def spy_add(sink, **kwargs):
+        added.append(sink)
+        return real_add(sink, **kwargs)
+
+    monkeypatch.setattr(time_awareness.logger, "add", spy_add)
+    first = time_awareness.TimeAwareness(app_dir=tmp_path, log_to_terminal=True)
+    first.close()
+    second = time_awareness.TimeAwareness(app_dir=tmp_path, log_to_terminal=True)
+    second.close()
+    assert added == [str(tmp_path / "timeawareness.log")]
@@ -1,4 +1,8 @@
+import ctypes
+import ctypes.util
 import datetime
+import os
+import re
 import subprocess
 import time
 import sys
@@ -8,25 +12,158 @@ from loguru import logger
 import threading
 import logging
 
-try:
-    from pydbus import SessionBus, SystemBus
-except Exception as e:
-    SessionBus = None
-    SystemBus = None
-    logger.warning("pydbus not available; lock and sleep detection disabled: {}", e)
-
 from database import (
-    save_session, get_sessions,
-    set_metadata, get_metadata, get_sessions_since, get_sessions_by_weekday,
-    get_sessions_for_day, get_previous_session, get_days_tracked, configure_database,
-    create_tables_if_not_exist,
+    save_sessions, get_all_sessions_raw, get_latest_sessions_raw,
+    set_metadata, set_metadata_bulk, get_metadata, get_weekday_totals, get_aggregate_stats,
+    get_previous_session, get_days_tracked, configure_database,
+    create_tables_if_not_exist, close_database, db_session, database_proxy, checkpoint_database,
     reset_database
 )
 
+SessionBus = None  # pydbus bus classes, imported by _load_pydbus() on first D-Bus use
+SystemBus = None
+_pydbus_loaded = False
+
+
+def _load_pydbus():
+    """
+    Import pydbus (and with it GLib/GIO) only once D-Bus is needed, so stats-only users don't pay for it.
+    """
+    global SessionBus, SystemBus, _pydbus_loaded
+    if _pydbus_loaded:
+        return
+    _pydbus_loaded = True
+    try:
+        import pydbus
+    except Exception as e:
+        logger.warning("pydbus not available; lock and sleep detection disabled: {}", e)
+        return
+    if SessionBus is None:
+        SessionBus = pydbus.SessionBus
+    if SystemBus is None:
+        SystemBus = pydbus.SystemBus
+
 
 # -------------------------
 # SystemMonitor
 # -------------------------
+# Parse sysctl/ioreg output in the bytes domain, without decoding or splitting it
+_BOOTTIME_RE = re.compile(rb"sec\s*=\s*(\d+)")
+_HID_IDLE_TIME_RE = re.compile(rb"HIDIdleTime\"?\s*=\s*(\d+)")
+
+
+def _load_iokit_idle_reader():
+    """
+    Build a reader for IOHIDSystem's HIDIdleTime through IOKit, so macOS idle polls need no ioreg process.
+
+    Returns:
+        Callable returning the idle time in nanoseconds, or None if IOKit is unavailable.
+    """
+    iokit_path = ctypes.util.find_library("IOKit")
+    cf_path = ctypes.util.find_library("CoreFoundation")
+    if not iokit_path or not cf_path:
+        return None
+    iokit = ctypes.CDLL(iokit_path)
+    cf = ctypes.CDLL(cf_path)
+
+    iokit.IOServiceMatching.restype = ctypes.c_void_p
+    iokit.IOServiceMatching.argtypes = [ctypes.c_char_p]
+    iokit.IOServiceGetMatchingService.restype = ctypes.c_uint32
+    iokit.IOServiceGetMatchingService.argtypes = [ctypes.c_uint32, ctypes.c_void_p]
+    iokit.IORegistryEntryCreateCFProperty.restype = ctypes.c_void_p
+    iokit.IORegistryEntryCreateCFProperty.argtypes = [ctypes.c_uint32, ctypes.c_void_p, ctypes.c_void_p,
+                                                      ctypes.c_uint32]
+    cf.CFStringCreateWithCString.restype = ctypes.c_void_p
+    cf.CFStringCreateWithCString.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_uint32]
+    cf.CFGetTypeID.restype = ctypes.c_ulong
+    cf.CFGetTypeID.argtypes = [ctypes.c_void_p]
+    cf.CFNumberGetTypeID.restype = ctypes.c_ulong
+    cf.CFNumberGetValue.restype = ctypes.c_bool
+    cf.CFNumberGetValue.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p]
+    cf.CFRelease.argtypes = [ctypes.c_void_p]
+
+    # IOServiceGetMatchingService consumes the matching dictionary; the service stays valid until reboot
+    service = iokit.IOServiceGetMatchingService(0, iokit.IOServiceMatching(b"IOHIDSystem"))
+    if not service:
+        return None
+    key = cf.CFStringCreateWithCString(None, b"HIDIdleTime", 0x08000100)  # kCFStringEncodingUTF8
+    number_type_id = cf.CFNumberGetTypeID()
+
+    def read_idle_ns():
+        prop = iokit.IORegistryEntryCreateCFProperty(service, key, None, 0)
+        if not prop:
+            raise RuntimeError("IOHIDSystem has no HIDIdleTime property")
+        try:
+            if cf.CFGetTypeID(prop) != number_type_id:
+                raise RuntimeError("HIDIdleTime is not a CFNumber")
+            value = ctypes.c_int64()
+            if not cf.CFNumberGetValue(prop, 4, ctypes.byref(value)):  # kCFNumberSInt64Type
+                raise RuntimeError("Failed to read HIDIdleTime")
+            return value.value
+        finally:
+            cf.CFRelease(prop)
+
+    read_idle_ns()  # fail here, not on the first poll
+    return read_idle_ns
+
+
+class _XScreenSaverInfo(ctypes.Structure):
+    _fields_ = [
+        ("window", ctypes.c_ulong),
+        ("state", ctypes.c_int),
+        ("kind", ctypes.c_int),
+        ("til_or_since", ctypes.c_ulong),
+        ("idle", ctypes.c_ulong),
+        ("eventMask", ctypes.c_ulong),
+    ]
+
+
+def _load_xss_idle_reader():
+    """
+    Build a reader for the X server's idle time through libXss, for X11 sessions without a D-Bus idle interface.
+
+    Returns:
+        Callable returning the idle time in milliseconds, or None if no X display or libXss is available.
+    """
+    if not os.environ.get("DISPLAY"):
+        return None
+    x11_path = ctypes.util.find_library("X11")
+    xss_path = ctypes.util.find_library("Xss")
+    if not x11_path or not xss_path:
+        return None
+    x11 = ctypes.CDLL(x11_path)
+    xss = ctypes.CDLL(xss_path)
+
+    x11.XOpenDisplay.restype = ctypes.c_void_p
+    x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+    x11.XDefaultRootWindow.restype = ctypes.c_ulong
+    x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+    xss.XScreenSaverAllocInfo.restype = ctypes.POINTER(_XScreenSaverInfo)
+    xss.XScreenSaverQueryInfo.restype = ctypes.c_int
+    xss.XScreenSaverQueryInfo.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(_XScreenSaverInfo)]
+
+    # The display connection and info struct are opened once and reused for every poll
+    display = x11.XOpenDisplay(None)
+    if not display:
+        return None
+    root = x11.XDefaultRootWindow(display)
+    info = xss.XScreenSaverAllocInfo()
+    if not info:
+        return None
+
+    # Xlib is not thread-safe without XInitThreads, and the lock-debounce timer polls from its own thread
+    display_lock = threading.Lock()
+
+    def read_idle_ms():
+        with display_lock:
+            if not xss.XScreenSaverQueryInfo(display, root, info):
+                raise RuntimeError("XScreenSaverQueryInfo failed")
+            return info.contents.idle
+
+    read_idle_ms()  # fail here, not on the first poll
+    return read_idle_ms
+
+
 class SystemMonitor:
     """
     Handles system-level monitoring such as uptime, idle time, and D-Bus events
@@ -35,77 +172,186 @@ class SystemMonitor:
 
     def __init__(self):
         self.screen_locked = False
+        self.idle_time_available = False  # whether the last get_idle_time() came from a real idle reader
+        self._idle_time_fct = None  # platform-specific idle time getter, resolved on first use
+        self._uptime_fct = None  # platform-specific uptime getter, resolved on first use
+        self._idle_reader = None  # cached D-Bus idle time reader (Linux)
+        self._idle_unavailable = False  # whether the last Linux poll found no idle interface
+        self._session_bus = None  # shared pydbus SessionBus, connected on first use
+        self._mutter_idle_monitor = None  # shared Mutter IdleMonitor proxy for idle polls and watches
+        self._xss_idle_ms = None  # libXss idle reader (Linux X11 fallback), loaded once
+        self._xss_checked = False
+        self._boot_epoch = None  # kern.boottime in epoch seconds (macOS), constant until reboot
+        self._uptime_fd = None  # /proc/uptime kept open and re-read with pread (Linux)
 
     def get_system_uptime(self) -> float:
+        # Resolve the platform branch once, like get_idle_time
+        if self._uptime_fct is None:
+            self._uptime_fct = self._resolve_uptime_fct()
         try:
-            if sys.platform.startswith("linux"):
-                with open("/proc/uptime") as f:
-                    return float(f.readline().split()[0])
-            elif sys.platform == "darwin":
-                output = subprocess.check_output(["sysctl", "-n", "kern.boottime"]).decode()
-                import re
-                match = re.search(r"sec = (\d+)", output)
-                if match:
-                    boot_time = int(match.group(1))
-                    now = int(time.time())
-                    return float(now - boot_time)
-                else:
-                    logger.error("Failed to parse kern.boottime output: {}", output)
-                    return 0.0
-            else:
-                logger.error("System uptime not supported on this platform: {}", sys.platform)
-                return 0.0
+            return self._uptime_fct()
         except Exception as e:
             logger.error("Failed to read system uptime: {}", e)
             return 0.0
 
+    def _resolve_uptime_fct(self):
+        if sys.platform.startswith("linux"):
+            # CLOCK_BOOTTIME is the clock behind /proc/uptime, read through the vDSO without any file I/O
+            if hasattr(time, "CLOCK_BOOTTIME"):
+                return self._get_system_uptime_boottime
+            return self._get_system_uptime_linux
+        elif sys.platform == "darwin":
+            return self._get_system_uptime_darwin
+        else:
+            return self._get_system_uptime_unsupported
+
+    def _get_system_uptime_boottime(self) -> float:
+        return time.clock_gettime(time.CLOCK_BOOTTIME)
+
+    def _get_system_uptime_linux(self) -> float:
+        if self._uptime_fd is None:
+            self._uptime_fd = os.open("/proc/uptime", os.O_RDONLY)
+        buf = os.pread(self._uptime_fd, 64, 0)
+        return float(buf[:buf.index(b" ")])
+
+    def _get_system_uptime_darwin(self) -> float:
+        if self._boot_epoch is None:
+            output = subprocess.check_output(["sysctl", "-n", "kern.boottime"])
+            match = _BOOTTIME_RE.search(output)
+            if not match:
+                logger.error("Failed to parse kern.boottime output: {}", output)
+                return 0.0
+            self._boot_epoch = int(match.group(1))
+        return float(int(time.time()) - self._boot_epoch)
+
+    def _get_system_uptime_unsupported(self) -> float:
+        logger.error("System uptime not supported on this platform: {}", sys.platform)
+        return 0.0
+
+    def close(self):
+        if self._uptime_fd is not None:
+            os.close(self._uptime_fd)
+            self._uptime_fd = None
+
     def get_idle_time(self) -> datetime.timedelta:
+        # Resolve the platform branch once; every later poll is a single call
+        if self._idle_time_fct is None:
+            self._idle_time_fct = self._resolve_idle_time_fct()
+        self.idle_time_available = True  # cleared by the fallbacks that only assume activity
         try:
-            if sys.platform.startswith("linux"):
-                idle = self._get_idle_time_linux()
-                if idle is not None:
-                    return idle
-                logger.warning("Idle detection unavailable, assuming active.")
-                return datetime.timedelta(seconds=0)
-            elif sys.platform == "darwin":
-                output = subprocess.check_output(["ioreg", "-c", "IOHIDSystem"]).decode()
-                for line in output.splitlines():
-                    if "HIDIdleTime" in line:
-                        idle_ns = int(line.split("=")[-1].strip().strip(";"))
-                        idle_sec = idle_ns / 1_000_000_000
-                        return datetime.timedelta(seconds=idle_sec)
-                return datetime.timedelta(seconds=0)
-            else:
-                logger.error("Idle time detection not supported on this platform: {}", sys.platform)
-                return datetime.timedelta(seconds=0)
+            return self._idle_time_fct()
         except Exception as e:
             logger.error("Failed to get idle time: {}", e)
+            self.idle_time_available = False
             return datetime.timedelta(seconds=0)
 
+    def _resolve_idle_time_fct(self):
+        if sys.platform.startswith("linux"):
+            return self._get_idle_time_linux_or_zero
+        elif sys.platform == "darwin":
+            try:
+                read_idle_ns = _load_iokit_idle_reader()
+            except Exception as e:
+                logger.warning("IOKit idle time unavailable, falling back to ioreg: {}", e)
+                read_idle_ns = None
+            if read_idle_ns is None:
+                return self._get_idle_time_darwin
+            return lambda: datetime.timedelta(seconds=read_idle_ns() / 1_000_000_000)
+        else:
+            return self._get_idle_time_unsupported
+
+    def _get_idle_time_linux_or_zero(self) -> datetime.timedelta:
+        idle = self._get_idle_time_linux()
+        if idle is not None:
+            if self._idle_unavailable:
+                logger.info("Idle detection available again.")
+                self._idle_unavailable = False
+            return idle
+        # Log on the transition only; the lookup is retried every poll
+        if not self._idle_unavailable:
+            logger.warning("Idle detection unavailable, assuming active.")
+            self._idle_unavailable = True
+        self.idle_time_available = False
+        return datetime.timedelta(seconds=0)
+
+    def _get_idle_time_darwin(self) -> datetime.timedelta:
+        output = subprocess.check_output(["ioreg", "-c", "IOHIDSystem"])
+        match = _HID_IDLE_TIME_RE.search(output)
+        if match:
+            idle_ns = int(match.group(1))
+            return datetime.timedelta(seconds=idle_ns / 1_000_000_000)
+        return datetime.timedelta(seconds=0)
+
+    def _get_idle_time_unsupported(self) -> datetime.timedelta:
+        logger.error("Idle time detection not supported on this platform: {}", sys.platform)
+        self.idle_time_available = False
+        return datetime.timedelta(seconds=0)
+
     def _get_idle_time_linux(self) -> Optional[datetime.timedelta]:
+        # Reuse the D-Bus proxy found on an earlier poll; look it up again only if it stops working
+        if self._idle_reader is not None:
+            try:
+                return self._idle_reader()
+            except Exception:
+                self._idle_reader = None
+                self._mutter_idle_monitor = None
+
+        self._idle_reader = self._connect_idle_reader()
+        if self._idle_reader is None:
+            return None
         try:
-            bus = SessionBus()
-            idle_monitor = bus.get("org.gnome.Mutter.IdleMonitor", "/org/gnome/Mutter/IdleMonitor/Core")
-            idle_time_ms = idle_monitor.GetIdletime()
-            return datetime.timedelta(microseconds=idle_time_ms)
+            return self._idle_reader()
         except Exception:
-            pass
+            self._idle_reader = None
+            return None
+
+    def _get_session_bus(self):
+        if self._session_bus is None:
+            _load_pydbus()
+            self._session_bus = SessionBus()
+        return self._session_bus
+
+    def _get_mutter_idle_monitor(self):
+        if self._mutter_idle_monitor is None:
+            self._mutter_idle_monitor = self._get_session_bus().get(
+                "org.gnome.Mutter.IdleMonitor", "/org/gnome/Mutter/IdleMonitor/Core")
+        return self._mutter_idle_monitor
+
+    def _connect_idle_reader(self):
+        """
+        Find the first D-Bus interface that reports idle time.
+
+        Returns:
+            Callable returning the idle time as a timedelta, or None if no interface is available.
+        """
         try:
-            bus = SessionBus()
-            ss = bus.get("org.freedesktop.ScreenSaver", "/org/freedesktop/ScreenSaver")
+            idle_monitor = self._get_mutter_idle_monitor()
+            idle_monitor.GetIdletime()
+            return lambda: datetime.timedelta(microseconds=idle_monitor.GetIdletime())
+        except Exception:
+            self._mutter_idle_monitor = None
+        try:
+            ss = self._get_session_bus().get("org.freedesktop.ScreenSaver", "/org/freedesktop/ScreenSaver")
             if hasattr(ss, "GetSessionIdleTime"):
-                idle_seconds = ss.GetSessionIdleTime()
-                return datetime.timedelta(seconds=float(idle_seconds))
+                return lambda: datetime.timedelta(seconds=float(ss.GetSessionIdleTime()))
             if hasattr(ss, "IdleTime"):
-                idle_seconds = ss.IdleTime
-                return datetime.timedelta(seconds=float(idle_seconds))
+                return lambda: datetime.timedelta(seconds=float(ss.IdleTime))
         except Exception:
             pass
+        if not self._xss_checked:
+            self._xss_checked = True
+            try:
+                self._xss_idle_ms = _load_xss_idle_reader()
+            except Exception as e:
+                logger.warning("libXss idle time unavailable: {}", e)
+        if self._xss_idle_ms is not None:
+            read_idle_ms = self._xss_idle_ms
+            return lambda: datetime.timedelta(milliseconds=read_idle_ms())
         return None
 
     def subscribe_lock_events(self, lock_handler_fct=None):
         try:
-            bus = SessionBus()
+            bus = self._get_session_bus()
         except Exception as e:
             logger.error("Failed to connect to SessionBus: {}", e)
             return False
@@ -150,8 +396,42 @@ class SystemMonitor:
             logger.warning("No ScreenSaver D-Bus interface available; lock detection disabled.")
             return False
 
-    def subscribe_sleep_events(self):
+    def subscribe_idle_events(self, idle_threshold_ms: int, idle_handler_fct=None) -> bool:
+        """
+        Ask Mutter to signal when the user goes idle for idle_threshold_ms and when they become active again.
+
+        Returns:
+            bool: True if the watches were registered, False if Mutter's IdleMonitor is unavailable.
+        """
+        try:
+            idle_monitor = self._get_mutter_idle_monitor()
+            idle_watch = idle_monitor.AddIdleWatch(idle_threshold_ms)
+            active_watch = None
+
+            def on_watch_fired(watch_id):
+                nonlocal active_watch
+                if watch_id == idle_watch:
+                    logger.info("User idle for {} ms.", idle_threshold_ms)
+                    # User-active watches fire once, on the next input, so only arm one while idle
+                    active_watch = idle_monitor.AddUserActiveWatch()
+                    if idle_handler_fct is not None:
+                        idle_handler_fct(True)
+                elif watch_id == active_watch:
+                    logger.info("User active again.")
+                    active_watch = None
+                    if idle_handler_fct is not None:
+                        idle_handler_fct(False)
+
+            idle_monitor.onWatchFired = on_watch_fired
+            logger.info("Subscribed to org.gnome.Mutter.IdleMonitor watches for idle detection.")
+            return True
+        except Exception:
+            logger.warning("Could not add Mutter idle watches; relying on idle time polling.")
+            return False
+
+    def subscribe_sleep_events(self, sleep_handler_fct=None):
         try:
+            _load_pydbus()
             sysbus = SystemBus()
             login1 = sysbus.get("org.freedesktop.login1", "/org/freedesktop/login1")
 
@@ -160,6 +440,8 @@ class SystemMonitor:
                     logger.info("System preparing for sleep.")
                 else:
                     logger.info("System resumed from sleep.")
+                if sleep_handler_fct is not None:
+                    sleep_handler_fct(bool(start_sleeping))
 
             login1.onPrepareForSleep = on_prepare_for_sleep
             logger.info("Subscribed to org.freedesktop.login1 PrepareForSleep for sleep detection.")
@@ -178,41 +460,56 @@ class SessionManager:
         self._lock = threading.RLock()
         self._last_save_time = 0  # seconds
         self._save_interval = 30  # seconds
+        self._saved_state = {}  # metadata key -> last value written, to skip unchanged writes
+        self._pending_sessions = []  # (start, end, duration) rows not yet written
+        self._last_saved_session_end = None  # end of the latest session this manager wrote
+        self._session_clock = None  # (current_session, time.monotonic()) taken when a session starts now
 
-    def start_session(self):
+    def start_session(self, now: Optional[datetime.datetime] = None):
         with self._lock:
+            started_now = now is None
+            if now is None:
+                now = datetime.datetime.now()
             if self.current_session is not None:
-                duration = datetime.datetime.now() - self.current_session
+                duration = now - self.current_session
                 if duration.total_seconds() < 1:
                     logger.warning("Skipping new session, too close to last one.")
                     return
-                self.end_session()
+                self.end_session(now)
 
-            self.current_session = datetime.datetime.now()
-            self._last_update_date = datetime.date.today()
+            self.current_session = now
+            self._session_clock = (now, time.monotonic()) if started_now else None
+            self._last_update_date = now.date()
             logger.info("Session started at {}", self.current_session)
 
             self.save_state()
 
-    def end_session(self) -> Optional[datetime.timedelta]:
+    def end_session(self, now: Optional[datetime.datetime] = None) -> Optional[datetime.timedelta]:
         with self._lock:
             if self.current_session is None:
                 logger.warning("Attempted to end session, but no session was started.")
                 return None
 
-            end_time = datetime.datetime.now()
+            end_time = now or datetime.datetime.now()
             session_duration = end_time - self.current_session
-            if session_duration.total_seconds() > 0:
-                saved = save_session(self.current_session, end_time, session_duration)
-                if not saved:
-                    logger.error("Failed to save session from {} to {}", self.current_session, end_time)
+            if now is None and session_duration.total_seconds() < 0:
+                elapsed = self._monotonic_elapsed()
+                if elapsed is not None:
+                    # The wall clock stepped back mid-session; trust the monotonic clock instead
+                    logger.warning("Wall clock moved backwards during session; using monotonic duration.")
+                    session_duration = datetime.timedelta(seconds=elapsed)
+                    end_time = self.current_session + session_duration
+            # Commit the session row and the updated state together
+            with database_proxy.atomic():
+                if session_duration.total_seconds() > 0 and not self._save_finished_session(end_time, session_duration):
                     return None
 
-            logger.info("Session ended at {} (duration: {})", end_time, session_duration)
-            self.current_session = None
-            self.today_total += session_duration.total_seconds()
+                logger.info("Session ended at {} (duration: {})", end_time, session_duration)
+                self.current_session = None
+                self._session_clock = None
+                self.today_total += session_duration.total_seconds()
 
-            self.save_state()
+                self.save_state()
 
             return session_duration
 
@@ -227,37 +524,78 @@ class SessionManager:
                 end_time = self.current_session
 
             session_duration = end_time - self.current_session
-            if session_duration.total_seconds() > 0:
-                saved = save_session(self.current_session, end_time, session_duration)
-                if not saved:
-                    logger.error("Failed to save session from {} to {}", self.current_session, end_time)
+            with database_proxy.atomic():
+                if session_duration.total_seconds() > 0 and not self._save_finished_session(end_time, session_duration):
                     return None
 
-            logger.info("Session ended at {} (duration: {}) [end_session_at]", end_time, session_duration)
-            self.current_session = None
+                logger.info("Session ended at {} (duration: {}) [end_session_at]", end_time, session_duration)
+                self.current_session = None
 
-            today = datetime.date.today()
-            if end_time.date() == today:
-                self.today_total += session_duration.total_seconds()
+                today = datetime.date.today()
+                if end_time.date() == today:
+                    self.today_total += session_duration.total_seconds()
 
-            self.save_state()
+                self.save_state()
 
             return session_duration
 
-    def save_state(self):
+    def _monotonic_elapsed(self) -> Optional[float]:
+        """Seconds since the current session started by the monotonic clock, if it was started by this manager."""
+        if self._session_clock is None or self._session_clock[0] is not self.current_session:
+            return None
+        return time.monotonic() - self._session_clock[1]
+
+    def _save_finished_session(self, end_time: datetime.datetime, duration: datetime.timedelta) -> bool:
+        """
+        Queue and flush the current session's row. On failure the row is dropped again and the caller keeps
+        current_session, so the session stays open and is saved in full by a later end.
+        """
+        row = (self.current_session, end_time, duration)
+        self._pending_sessions.append(row)
+        try:
+            saved = self.flush_sessions()
+        except Exception as e:
+            logger.error("Failed to flush sessions: {}", e)
+            saved = False
+        if not saved:
+            self._pending_sessions.remove(row)
+            logger.error("Failed to save session from {} to {}", self.current_session, end_time)
+        return saved
+
+    def flush_sessions(self) -> bool:
+        """Write all pending sessions in one transaction; rows that fail stay queued for the next flush."""
+        with self._lock:
+            if not self._pending_sessions:
+                return True
+            if not save_sessions(self._pending_sessions):
+                logger.error("Failed to save {} pending session(s), will retry", len(self._pending_sessions))
+                return False
+            self._last_saved_session_end = self._pending_sessions[-1][1]
+            self._pending_sessions.clear()
+            return True
+
+    def save_state(self, force: bool = False):
+        """
+        Persist changed state, at most every _save_interval seconds unless forced; throttled
+        changes are picked up by the next save since only keys differing from _saved_state are written.
+        """
         now = time.time()
-        if now - self._last_save_time < self._save_interval:
+        if not force and now - self._last_save_time < self._save_interval:
             return
         self._last_save_time = now
 
         with self._lock:
-            set_metadata("today_total", self.today_total)
-
             last_update_date = self._last_update_date.isoformat() if self._last_update_date else ""
-            set_metadata("last_update_date", last_update_date)
-
             current_session = self.current_session.isoformat() if self.current_session else ""
-            set_metadata("current_session", current_session)
+            state = {
+                "today_total": str(self.today_total),
+                "last_update_date": last_update_date,
+                "current_session": current_session,
+            }
+            changed = {key: value for key, value in state.items() if self._saved_state.get(key) != value}
+            # One transaction for all changed keys instead of one per set_metadata call
+            if changed and set_metadata_bulk(changed):
+                self._saved_state.update(changed)
 
     def load_state(self):
         self.today_total = float(get_metadata("today_total") or 0)
@@ -276,40 +614,52 @@ class SessionManager:
             logger.error("Failed to parse current_session from metadata: {}", e)
             self.current_session = None
 
-    def check_day_rollover(self):
-        today = datetime.date.today()
-        if self._last_update_date is not None and today != self._last_update_date:
-            logger.info("New day detected. Recalculating today_total.")
+    @property
+    def last_update_date(self) -> Optional[datetime.date]:
+        return self._last_update_date
 
-            self.today_total = 0
-            midnight = datetime.datetime.combine(today, datetime.time.min)
-
-            # If a session survived past midnight, only count a small safe overlap to avoid phantom time.
-            if self.current_session and self.current_session < midnight:
-                elapsed_since_midnight = (datetime.datetime.now() - midnight).total_seconds()
-                if elapsed_since_midnight <= 600:  # cap at 10 minutes
-                    self.today_total += elapsed_since_midnight
-                    logger.info("Added overlap from ongoing session: {} seconds", elapsed_since_midnight)
-                else:
-                    logger.info("Skipped overlap from ongoing session: {} seconds exceeds cap (likely slept)",
-                                elapsed_since_midnight)
-
-            # If the most recently SAVED session overlaps midnight, include only the portion after midnight
-            previous = get_previous_session(verbose=False)
-            if previous:
-                prev_start, prev_end, prev_duration = previous
-                if prev_end > midnight:
+    def check_day_rollover(self, today: Optional[datetime.date] = None):
+        if today is None:
+            today = datetime.date.today()
+        # Compare-and-reset under the lock: the daemon thread and total_time_today can both get here at midnight
+        with self._lock:
+            if self._last_update_date is not None and today != self._last_update_date:
+                logger.info("New day detected. Recalculating today_total.")
+
+                self.today_total = 0
+                midnight = datetime.datetime.combine(today, datetime.time.min)
+
+                # If a session survived past midnight, only count a small safe overlap to avoid phantom time.
+                if self.current_session and self.current_session < midnight:
+                    elapsed_since_midnight = (datetime.datetime.now() - midnight).total_seconds()
+                    if elapsed_since_midnight <= 600:  # cap at 10 minutes
+                        self.today_total += elapsed_since_midnight
+                        logger.info("Added overlap from ongoing session: {} seconds", elapsed_since_midnight)
+                    else:
+                        logger.info("Skipped overlap from ongoing session: {} seconds exceeds cap (likely slept)",
+                                    elapsed_since_midnight)
+
+                # If the most recently SAVED session overlaps midnight, include only the portion after midnight.
+                # Only ask the database when this manager hasn't saved one itself (e.g. right after a restart).
+                prev_end = self._last_saved_session_end
+                if prev_end is None:
+                    previous = get_previous_session(verbose=False)
+                    prev_end = previous[1] if previous else None
+                if prev_end is not None and prev_end > midnight:
                     overlap = (prev_end - midnight).total_seconds()
                     self.today_total += overlap
                     logger.info("Added overlap from previous session: {} seconds", overlap)
 
-            self._last_update_date = today
-            self.save_state()
+                self._last_update_date = today
+                self.save_state()
 
     def reset(self):
         self.today_total = 0
         self.current_session = None
         self._last_update_date = None
+        self._saved_state.clear()
+        self._last_saved_session_end = None
+        self._session_clock = None
 
 
 # -------------------------
@@ -322,34 +672,107 @@ class Daemon:
         self._session_manager = session_manager
         self._system_monitor = system_monitor
         self._daemon_stop_event = threading.Event()
+        self._wake_event = threading.Event()  # set by lock/sleep/idle signals, wake() and stop() to cut a poll short
+        self._idle_watches = False  # whether Mutter idle/active watches were added
+        self._idle_events = False  # whether a watch signal was actually delivered, i.e. a main loop dispatches them
+        self._lock_debounce = 0.5  # seconds a lock/unlock state must hold before it is applied
+        self._lock_timer = None  # pending threading.Timer for the latest lock/unlock signal
+        self._lock_timer_guard = threading.Lock()
+        self._last_seen_interval = 60  # seconds between last_seen_time writes
+        self._last_seen_persisted = 0.0  # time.monotonic() of the last last_seen_time write
+        self._recheck_uptime = False  # set on resume or a detected sleep gap; only then can uptime have reset
         self._is_active = False
         self._last_check = None  # datetime.datetime.now
         self._monitor_lock_and_sleep = monitor_lock_and_sleep
         self._end_session_on_restart = end_session_on_restart
         self._end_session_idle_threshold = datetime.timedelta(minutes=end_session_idle_threshold)  # minutes
         self._boot_detection_limit = boot_detection_limit  # seconds
+        self._checkpoint_interval = 300  # seconds
+        self._last_checkpoint = time.monotonic()
 
     def _handle_lock_event(self, locked: bool):
         """
-        Handle lock/unlock events: end session on lock, start session on unlock if idle threshold is met.
+        Debounce lock/unlock signals: only the last state seen within _lock_debounce seconds is applied,
+        so a burst of ActiveChanged signals (session switch, resume) costs one session change.
+        """
+        event_time = datetime.datetime.now()
+        with self._lock_timer_guard:
+            if self._lock_timer is not None:
+                self._lock_timer.cancel()
+            self._lock_timer = threading.Timer(self._lock_debounce, self._apply_lock_event, (locked, event_time))
+            self._lock_timer.daemon = True
+            self._lock_timer.start()
+
+    def _apply_lock_event(self, locked: bool, event_time: datetime.datetime):
+        """
+        Apply a lock/unlock: end session on lock, start session on unlock if idle threshold is met.
         """
-        if locked:
-            logger.info("Screen locked - ending session immediately (active: {}).", self._is_active)
-            if self._session_manager.current_session:
-                self._session_manager.end_session()
-            self._is_active = False
+        with db_session():
+            if locked:
+                logger.info("Screen locked - ending session immediately (active: {}).", self._is_active)
+                if self._session_manager.current_session:
+                    self._session_manager.end_session(event_time)
+                self._is_active = False
+            else:
+                logger.info("Screen unlocked (active: {}).", self._is_active)
+                if not self._is_active:
+                    idle_time = self._system_monitor.get_idle_time()
+                    if idle_time < self._end_session_idle_threshold:
+                        self._session_manager.start_session(event_time)
+                        logger.info("Session started after unlock (idle time: {} < {}).",
+                                    idle_time, self._end_session_idle_threshold)
+                        self._is_active = True
+                    else:
+                        logger.info("Screen unlock idle time: {} >= {}.",
+                                    idle_time, self._end_session_idle_threshold)
+            self._flush_last_seen(event_time)
+        self._wake_event.set()
+
+    def _handle_sleep_event(self, sleeping: bool):
+        """
+        Wake the daemon loop on suspend/resume so the elapsed-gap check runs right away instead of on the next poll.
+        """
+        if sleeping:
+            with db_session():
+                self._flush_last_seen()
         else:
-            logger.info("Screen unlocked (active: {}).", self._is_active)
-            if not self._is_active:
-                idle_time = self._system_monitor.get_idle_time()
-                if idle_time < self._end_session_idle_threshold:
-                    self._session_manager.start_session()
-                    logger.info("Session started after unlock (idle time: {} < {}).",
-                                idle_time, self._end_session_idle_threshold)
-                    self._is_active = True
-                else:
-                    logger.info("Screen unlock idle time: {} >= {}.",
-                                idle_time, self._end_session_idle_threshold)
+            self._recheck_uptime = True
+        self._wake_event.set()
+
+    def _touch_last_seen(self, now: Optional[datetime.datetime] = None):
+        """
+        Persist last_seen_time at most every _last_seen_interval seconds; fresh-boot detection only needs minutes.
+        """
+        if time.monotonic() - self._last_seen_persisted >= self._last_seen_interval:
+            self._flush_last_seen(now)
+
+    def _flush_last_seen(self, now: Optional[datetime.datetime] = None):
+        set_metadata("last_seen_time", (now or datetime.datetime.now()).isoformat())
+        self._last_seen_persisted = time.monotonic()
+
+    def _handle_idle_event(self, idle: bool):
+        """
+        Wake the daemon loop when the user crosses the idle threshold in either direction.
+
+        Watches are only delivered while a GLib main loop runs (the tray app); without one, e.g. the CLI
+        daemon, this never fires and the loop keeps polling at poll_interval.
+        """
+        self._idle_events = self._idle_watches
+        self._wake_event.set()
+
+    def wake(self):
+        """
+        Cut the current wait short so the loop re-reads the session state, e.g. after a session was started
+        or ended from outside the daemon.
+        """
+        self._wake_event.set()
+
+    def _wait(self, poll_interval: float):
+        """
+        Sleep until the next poll, returning early if a lock/sleep signal, wake() or stop() wakes the loop.
+        """
+        if self._wake_event.wait(timeout=poll_interval):
+            self._wake_event.clear()
 
     def _is_fresh_boot(self, uptime: float) -> bool:
         """
@@ -369,7 +792,14 @@ class Daemon:
                 return True
         return False
 
-    def run(self, poll_interval: float = 5.0, sleep_detection_threshold: float = 30.0, verbose: bool = False):
+    def run(self, poll_interval: float = 5.0, sleep_detection_threshold: float = 30.0, verbose: bool = False,
+            max_poll_interval: float = 60.0):
+        # Hold one connection for the daemon's lifetime instead of reconnecting on every poll
+        with db_session():
+            self._run(poll_interval, sleep_detection_threshold, verbose, max_poll_interval)
+
+    def _run(self, poll_interval: float, sleep_detection_threshold: float, verbose: bool,
+             max_poll_interval: float = 60.0):
         logger.info("TimeAwareness daemon started. Press Ctrl+C to quit.")
         self._is_active = True
         last_uptime = self._system_monitor.get_system_uptime()
@@ -385,16 +815,22 @@ class Daemon:
 
         if self._monitor_lock_and_sleep:
             self._system_monitor.subscribe_lock_events(self._handle_lock_event)
-            self._system_monitor.subscribe_sleep_events()
+            self._system_monitor.subscribe_sleep_events(self._handle_sleep_event)
+            threshold_ms = int(self._end_session_idle_threshold.total_seconds() * 1000)
+            self._idle_watches = self._system_monitor.subscribe_idle_events(threshold_ms, self._handle_idle_event)
 
+        wait = poll_interval  # grows while locked, idle or far from the idle threshold; signals wake the loop early
         try:
             logger.debug("Entering daemon loop.")
             while not self._daemon_stop_event.is_set():
-                self._session_manager.check_day_rollover()
-
+                # Wall clock on purpose: CLOCK_MONOTONIC stops during suspend, which would hide the sleep gap
                 now = datetime.datetime.now()
-                prev_check = self._last_check or datetime.datetime.now()
+                self._session_manager.check_day_rollover(now.date())
+
+                prev_check = self._last_check or now
                 elapsed = (now - prev_check).total_seconds()
+                # A backed-off wait is expected, not a sign of sleep
+                elapsed -= wait - poll_interval
 
                 if sleep_detection_threshold < elapsed < 24 * 3600:
                     logger.info("Detected sleep via elapsed gap (elapsed {:.2f}s > {:.2f}s). Ending session (active: {}).",
@@ -402,62 +838,97 @@ class Daemon:
                     if self._is_active and self._session_manager.current_session:
                         self._session_manager.end_session_at(prev_check)
                     self._is_active = False
+                    self._recheck_uptime = True
                 self._last_check = now
 
-                current_uptime = self._system_monitor.get_system_uptime()
-                if current_uptime < last_uptime:
-                    logger.info("System reboot detected (uptime: {}).", current_uptime)
-                    if self._end_session_on_restart and self._session_manager.current_session:
-                        self._session_manager.end_session()
-                        logger.info("Session ended due to system restart.")
-                last_uptime = current_uptime
+                # Uptime cannot go backwards between two ticks unless the machine was suspended in between
+                if self._recheck_uptime:
+                    self._recheck_uptime = False
+                    current_uptime = self._system_monitor.get_system_uptime()
+                    if current_uptime < last_uptime:
+                        logger.info("System reboot detected (uptime: {}).", current_uptime)
+                        if self._end_session_on_restart and self._session_manager.current_session:
+                            self._session_manager.end_session(now)
+                            logger.info("Session ended due to system restart.")
+                    last_uptime = current_uptime
+
+                # Checkpoint between writes rather than letting SQLite do it mid-write
+                if time.monotonic() - self._last_checkpoint >= self._checkpoint_interval:
+                    checkpoint_database()
+                    self._last_checkpoint = time.monotonic()
 
                 if self._monitor_lock_and_sleep and self._system_monitor.screen_locked:
-                    time.sleep(poll_interval)
-                    set_metadata("last_seen_time", datetime.datetime.now().isoformat())
+                    wait = min(wait * 2, max_poll_interval)
+                    self._wait(wait)
+                    self._touch_last_seen()
                     continue
 
                 idle_time = self._system_monitor.get_idle_time()
                 if verbose:
                     logger.debug("Idle time: {} (active: {})", idle_time, self._is_active)
 
+                # Commit any session change together with a due last_seen_time write in a single transaction
+                with database_proxy.atomic():
+                    if self._is_active:
+                        if idle_time >= self._end_session_idle_threshold:
+                            self._session_manager.end_session(now)
+                            logger.info("Session ended due to inactivity (idle time: {} >= {}).",
+                                        idle_time, self._end_session_idle_threshold)
+                            self._is_active = False
+                    else:
+                        if idle_time < self._end_session_idle_threshold:
+                            self._session_manager.start_session(now)
+                            logger.info("Session started due to user activity (idle time: {} < {}).",
+                                        idle_time, self._end_session_idle_threshold)
+                            self._is_active = True
+
+                    self._touch_last_seen(now)
+
                 if self._is_active:
-                    if idle_time >= self._end_session_idle_threshold:
-                        self._session_manager.end_session()
-                        logger.info("Session ended due to inactivity (idle time: {} >= {}).",
-                                    idle_time, self._end_session_idle_threshold)
-                        self._is_active = False
+                    wait = poll_interval
+                    # Idle time only grows at wall speed, so nothing can change before the threshold is reached;
+                    # without a real idle reader (idle time stuck at 0) keep the plain poll rate
+                    if self._system_monitor.idle_time_available and poll_interval > 0:
+                        until_idle = (self._end_session_idle_threshold - idle_time).total_seconds()
+                        wait = min(max(until_idle, poll_interval), max_poll_interval)
+                elif self._idle_events:
+                    # With idle watches the user's return is signalled, so an idle user needs no fast polling
+                    wait = min(wait * 2, max_poll_interval)
                 else:
-                    if idle_time < self._end_session_idle_threshold:
-                        self._session_manager.start_session()
-                        logger.info("Session started due to user activity (idle time: {} < {}).",
-                                    idle_time, self._end_session_idle_threshold)
-                        self._is_active = True
-
-                set_metadata("last_seen_time", datetime.datetime.now().isoformat())
-                time.sleep(poll_interval)
+                    wait = poll_interval
+                self._wait(wait)
         except KeyboardInterrupt:
             self.stop()
 
     def stop(self):
         logger.info("Stopping daemon...")
         self._daemon_stop_event.set()
+        self._wake_event.set()
+        with self._lock_timer_guard:
+            if self._lock_timer is not None:
+                self._lock_timer.cancel()
 
         if self._is_active:
             self._session_manager.end_session()
             logger.info("Session ended due to daemon stop.")
 
-        self._session_manager.save_state()
-        set_metadata("last_seen_time", datetime.datetime.now().isoformat())
+        self._session_manager.flush_sessions()
+        self._session_manager.save_state(force=True)
+        self._flush_last_seen()
         logger.info("Daemon stopped.")
 
 
 # -------------------------
 # Main Wrapper App
 # -------------------------
+_log_sink_paths = set()  # log files that already have a loguru sink in this process
+
+
 class TimeAwareness:
-    def __init__(self, app_dir: Path, start_daemon: bool = False, log_to_terminal: bool = False):
-        self._setup_logging_and_db(app_dir, log_to_terminal)
+    def __init__(self, app_dir: Path, start_daemon: bool = False, log_to_terminal: bool = False,
+                 read_only: bool = False):
+        self._read_only = read_only and not start_daemon
+        self._setup_logging_and_db(app_dir, log_to_terminal, self._read_only)
 
         self._session_manager = SessionManager()
         self._system_monitor = SystemMonitor()
@@ -472,26 +943,45 @@ class TimeAwareness:
 
         logger.info("TimeAwarenessApp initialized.")
 
-    def _setup_logging_and_db(self, app_dir: Path, log_to_terminal: bool = False):
+    def _setup_logging_and_db(self, app_dir: Path, log_to_terminal: bool = False, read_only: bool = False):
         logging.getLogger("peewee").setLevel(logging.CRITICAL)
 
         if not app_dir.exists():
             app_dir.mkdir(parents=True)
 
         log_path = app_dir / "timeawareness.log"
-        logger.add(str(log_path), rotation="10 MB", retention="10 days")
+        # One sink per file: every extra sink would format and write each message again
+        if log_path not in _log_sink_paths:
+            # enqueue hands file writes (and rotation) to loguru's worker thread, off the daemon loop
+            logger.add(str(log_path), rotation="10 MB", retention="10 days", enqueue=True)
+            _log_sink_paths.add(log_path)
         if not log_to_terminal:
-            logger.remove(0)
+            try:
+                logger.remove(0)
+            except ValueError:
+                pass  # default terminal sink already removed by an earlier instance
 
         db_path = app_dir / "timeawareness.sqlite"
-        configure_database(database=db_path)
-        create_tables_if_not_exist()
+        if read_only and db_path.exists():
+            configure_database(database=db_path, read_only=True)
+        else:
+            configure_database(database=db_path)
+            create_tables_if_not_exist()
 
     def start_session(self):
-        return self._session_manager.start_session()
+        result = self._session_manager.start_session()
+        self._wake_daemon()
+        return result
 
     def end_session(self):
-        return self._session_manager.end_session()
+        result = self._session_manager.end_session()
+        self._wake_daemon()
+        return result
+
+    def _wake_daemon(self):
+        # The active wait can stretch up to max_poll_interval; let the loop see the change right away
+        if self._daemon_thread is not None:
+            self._daemon.wake()
 
     def current_session_info(self, verbose: bool = True) -> Optional[
         Tuple[datetime.datetime, datetime.datetime, datetime.timedelta]]:
@@ -509,50 +999,77 @@ class TimeAwareness:
     def days_tracked(self):
         return get_days_tracked()
 
-    def total_time_today(self):
+    def total_time_today(self) -> datetime.timedelta:
+        # Without a daemon thread nothing rolls today_total over at midnight, so check before reporting it;
+        # with one running, the rollover stays on the daemon thread
+        if not self._read_only and self._daemon_thread is None:
+            self._session_manager.check_day_rollover()
+        elif self._session_manager.last_update_date != datetime.date.today():
+            return datetime.timedelta()  # the stored total belongs to an earlier day
         return datetime.timedelta(seconds=self._session_manager.today_total)
 
     def total_time_yesterday(self) -> datetime.timedelta:
-        yesterday = datetime.datetime.now().date() - datetime.timedelta(days=1)
-        history = get_sessions_for_day(yesterday)
-        total = sum((duration for start, end, duration in history), datetime.timedelta())
-        return total
+        return datetime.timedelta(seconds=self._aggregate_stats()["day_total"])
 
     def seven_day_average(self) -> datetime.timedelta:
-        seven_days_ago = datetime.datetime.now() - datetime.timedelta(days=7)
-        history = get_sessions_since(seven_days_ago)
-        total = sum((duration for start, end, duration in history), datetime.timedelta())
-        days_count = len({start.date() for start, end, duration in history})
-        if days_count == 0:
+        stats = self._aggregate_stats()
+        if stats["since_days"] == 0:
             return datetime.timedelta()
-        return total / days_count
+        return datetime.timedelta(seconds=stats["since_total"] / stats["since_days"])
 
     def weekday_average(self) -> datetime.timedelta:
-        weekday_histories = get_sessions_by_weekday()
-        averages = []
-        for durations in weekday_histories.values():
-            if durations:
-                averages.append(sum(durations, datetime.timedelta()) / len(durations))
+        averages = [total / count for total, count in get_weekday_totals().values() if count]
         if not averages:
             return datetime.timedelta()
-        return sum(averages, datetime.timedelta()) / len(averages)
+        return datetime.timedelta(seconds=sum(averages) / len(averages))
 
     def total_average(self) -> datetime.timedelta:
-        history = get_sessions()
-        if not history:
+        stats = self._aggregate_stats()
+        if stats["sessions"] == 0:
             return datetime.timedelta()
-        total = sum((duration for start, end, duration in history), datetime.timedelta())
-        return total / len(history)
+        return datetime.timedelta(seconds=stats["total"] / stats["sessions"])
+
+    def _aggregate_stats(self) -> dict:
+        # Whole-minute window bound so repeated calls hit cached_read until the next write or minute
+        now = datetime.datetime.now().replace(second=0, microsecond=0)
+        return get_aggregate_stats(now.date() - datetime.timedelta(days=1), now - datetime.timedelta(days=7))
+
+    def history(self, count_sessions: bool = False, limit: Optional[int] = None):
+        """
+        Collect the session statistics and, unless count_sessions is set, the sessions newest first.
 
-    def history(self, count_sessions: bool = False):
+        Args:
+            count_sessions (bool): Return the number of sessions instead of the session list.
+            limit (int, optional): Only return the latest `limit` sessions; `session_count` still counts all.
+        """
+        # One read transaction so a session saved by the daemon mid-call can't split the figures across snapshots
+        with db_session(), database_proxy.atomic():
+            stats = self._aggregate_stats()
+            weekday_average = self.weekday_average()
+            if count_sessions:
+                raw_sessions = []
+            elif limit is None:
+                raw_sessions = get_all_sessions_raw()[::-1]
+            else:
+                raw_sessions = get_latest_sessions_raw(limit)
+        if count_sessions:
+            sessions = stats["sessions"]
+        else:
+            sessions = [
+                (start, end, datetime.timedelta(seconds=duration))
+                for start, end, duration in raw_sessions
+            ]
         return {
-            "days": self.days_tracked(),
+            "days": stats["days"],
+            "session_count": stats["sessions"],
             "total_today": self.total_time_today(),
-            "total_yesterday": self.total_time_yesterday(),
-            "seven_day_average": self.seven_day_average(),
-            "weekday_average": self.weekday_average(),
-            "total_average": self.total_average(),
-            "sessions": get_sessions(count_sessions),
+            "total_yesterday": datetime.timedelta(seconds=stats["day_total"]),
+            "seven_day_average": datetime.timedelta(
+                seconds=stats["since_total"] / stats["since_days"] if stats["since_days"] else 0),
+            "weekday_average": weekday_average,
+            "total_average": datetime.timedelta(
+                seconds=stats["total"] / stats["sessions"] if stats["sessions"] else 0),
+            "sessions": sessions,
         }
 
     def reset(self):
@@ -568,3 +1085,10 @@ class TimeAwareness:
             logger.info("Daemon thread joined successfully.")
         else:
             logger.info("No active daemon thread to stop.")
+
+    def close(self):
+        # save_state is throttled, so a session ended just before closing would otherwise not be persisted
+        if not self._read_only:
+            self._session_manager.save_state(force=True)
+        self._system_monitor.close()
+        close_database()